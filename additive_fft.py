@@ -0,0 +1,123 @@
+'''
+Author: Nishka Dasgupta
+
+An implementation of the additive FFT over GF(2^m) described in
+Shuhong Gao and Todd Mateer. "Additive Fast Fourier Transforms Over Finite Fields". In: IEEE Transactions on Information Theory 56.12 (2010), pp. 6265–6272.
+It evaluates a polynomial on every element of the span of a basis (e.g. the whole field) in one pass, which is used to find the roots of the
+error locator in bernstein.goppa_errors.
+Polynomials are lists of coefficients, lowest degree first.
+
+Functions:
+ - field_basis: The polynomial basis 1, z, ..., z^(m-1) of GF(2^m)
+ - field_span: All GF(2)-linear combinations of a basis, in the order in which fft returns its values
+ - taylor_expansion: Write f(x) = f0(x^2 + x) + x * f1(x^2 + x)
+ - fft: Evaluate a polynomial on the span of a basis
+ - evaluation_points: Precompute where each support element sits in the output of fft over the whole field
+ - evaluate_on_support: Evaluate a polynomial on every support element with one fft
+ - test_fft: Test fft against direct evaluation
+'''
+
+from sage.all_cmdline import *   # import sage library
+
+#Takes as input a field GF(2^m)
+#Returns its polynomial basis as a list of m elements
+def field_basis(k):
+    z = k.gen()
+    return [z**i for i in range(k.degree())]
+
+#Takes as input a list of field elements (a basis)
+#Returns the list of all their GF(2)-linear combinations; entry i is the sum of the basis elements selected by the bits of i
+def field_span(basis):
+    span = [basis[0].parent()(0)]
+    for b in basis:
+        span = span + [s + b for s in span]
+    return span
+
+#Takes as input a list f of coefficients over a field of characteristic 2
+#Returns (f0, f1) with f(x) = f0(x^2 + x) + x * f1(x^2 + x), by repeated division by x^2 + x
+def taylor_expansion(f):
+    f = list(f)
+    f0 = []
+    f1 = []
+    while len(f) > 2:
+        q = f[2:]
+        #x^i = x^(i-2) * (x^2 + x) + x^(i-1), so fold each top coefficient into the quotient and one degree down
+        for i in range(len(f) - 1, 1, -1):
+            q[i - 2] = f[i]
+            f[i - 1] = f[i - 1] + f[i]
+        f0.append(f[0])
+        f1.append(f[1])
+        f = q
+    if len(f) > 0:
+        f0.append(f[0])
+    if len(f) == 2:
+        f1.append(f[1])
+    return f0, f1
+
+#Takes as input a list f of coefficients and a list of m field elements (linearly independent over GF(2))
+#Returns the list of the 2^m values of f on field_span(basis), in the same order
+def fft(f, basis):
+    m = len(basis)
+    zero = basis[0].parent()(0)
+    if len(f) == 0:
+        return [zero] * (2**m)
+    if len(f) == 1:
+        return [f[0]] * (2**m)
+    if m == 1:
+        value = zero
+        for c in reversed(f):
+            value = value * basis[0] + c
+        return [f[0], value]
+    #g(x) = f(beta * x), so the points are beta * (G_i + b) for G_i in the span of gamma = basis / beta and b in {0, 1}
+    beta = basis[-1]
+    g = []
+    power = beta.parent()(1)
+    for c in f:
+        g.append(c * power)
+        power = power * beta
+    g0, g1 = taylor_expansion(g)
+    gamma = [b / beta for b in basis[:-1]]
+    delta = [c * c + c for c in gamma] #(G_i + b)^2 + (G_i + b) = G_i^2 + G_i is in the span of delta
+    u = fft(g0, delta)
+    v = fft(g1, delta)
+    G = field_span(gamma)
+    half = 2**(m - 1)
+    w = [zero] * (2 * half)
+    for i in range(half):
+        w[i] = u[i] + G[i] * v[i]
+        w[i + half] = w[i] + v[i]
+    return w
+
+#Takes as input a field GF(2^m) and a support list alpha
+#Returns (basis, positions) where positions[j] is the index of alpha[j] in field_span(basis); computed once per key
+def evaluation_points(k, alpha):
+    basis = field_basis(k)
+    span = field_span(basis)
+    index = {}
+    for i in range(len(span)):
+        index[span[i]] = i
+    return basis, [index[aj] for aj in alpha]
+
+#Takes as input a list f of coefficients and the output of evaluation_points(k, alpha)
+#Returns [f(alpha[j]) for every j]
+def evaluate_on_support(f, points):
+    basis, positions = points
+    values = fft(f, basis)
+    return [values[p] for p in positions]
+
+def test_fft():
+    for m in range(1, 10):
+        k = GF(2**m)
+        kpoly = k['x']
+        basis = field_basis(k)
+        span = field_span(basis)
+        assert len(set(span)) == 2**m
+        for loop in range(20):
+            f = kpoly.random_element(randrange(3 * m))
+            assert fft(f.list(), basis) == [f(s) for s in span]
+            alpha = list(k)
+            shuffle(alpha)
+            alpha = alpha[:randrange(1, 2**m + 1)]
+            assert evaluate_on_support(f.list(), evaluation_points(k, alpha)) == [f(aj) for aj in alpha]
+
+#test_fft()
@@ -3,31 +3,52 @@ Author: Nishka Dasgupta
 
 This file contains miscellaneous conversion functions, hash functions, and other helper functions for the other programs. See work referenced in sendrier.py and ideal.py on Golomb encoding.
 
+Classes:
+ - BitVector: A GF(2) vector packed into a Python integer (XOR, slicing, concatenation and popcount work on whole machine words)
+ - BitReader: Reads multi-bit fields, most significant first, from a bit stream held in an integer
+ - BitWriter: Appends multi-bit fields, most significant first, to a bit stream packed into bytes
+
 Functions:
  - pad_as_list: Pads or truncates the binary representation of a number as a list 
  - pad_as_bitstring: Pads or truncates the binary representation of a number as a 
  - concat_vectors: Concatenates vectors into a new vector
  - concat_vectors_to_bytearray: Concatenates vectors as bytes (for hash input)
+ - to_bitvector: Converts a sagemath row matrix, bitstring or BitVector to a BitVector
+ - oracle_input: Encodes vectors as a hash input, in the legacy (one byte per bit) or the packed (versioned, 8 bits per byte) encoding
  - vector_to_bitstring: Converts binary vector to bitstring
  - vector_to_bytes: Converts binary vector to bytes (for hash input)
  - vector_to_positional: Converts a binary vector to its Golomb run-length encoding
+ - bitvector_to_positional: Converts a BitVector to its Golomb run-length encoding
  - bitstring_to_vector: Converts a bitstring to a binary vector
  - bitstring_to_bytes: Converts a bitstring to bytes
  - bitstring_to_positional: Converts a bitstring to its Golomb run-length encoding 
  - positional_to_vector: Converts a Golomb run-length encoding to a binary vector
+ - positional_to_bitvector: Converts a Golomb run-length encoding to a BitVector
  - positional_to_bitstring: Converts a Golomb run-length encoding to a bitstring
  - LSB: least significant bits
  - MSB: Most significant bits 
+ - binomial_params: Exact C(n, t) with its bit and byte lengths, computed once per (n, t)
+ - squeeze: cSHAKE256 output bytes of an input under a customization string
  - H: cSHAKE256 hash output in n choose t bits
+ - H1_bitvector: cSHAKE256 hash output in custom bits as a BitVector
  - H1: cSHAKE256 hash output in custom bits 
+ - R_bitvector: cSHAKE256 hash output in custom bits as a BitVector (different custom string from H1 for different distribution)
  - R: cSHAKE256 hash output in custom bits (different custom string from H1 for different distribution)
  - test_positional_vector_interconversion: Test
+ - test_bitvector: Test that BitVector operations agree with the sagemath row matrix versions
+ - test_bitstream: Test BitReader and BitWriter against bitstring slicing and concatenation
+ - test_oracle_input: Test that the legacy encoding matches the byte-per-bit functions and that the packed encoding does not depend on the vector type
+
+squeeze (one cSHAKE256 call) and oracle_input are timed in instrument.py spans.
 '''
 
 from sage.all_cmdline import *   # import sage library
 from Crypto.Hash import cSHAKE256
-from math import ceil, floor, log2
+from math import ceil, floor, log2, comb
 from random import randrange
+from functools import lru_cache
+import numpy as np
+import instrument
 
 #Takes an integer input num and a bitlength length
 #Returns a vector (as a list) of the binary representation of num in exactly length bits
@@ -49,187 +70,372 @@ def pad_as_list(num, length):
 #Returns a string of bits of the binary representation of num in exactly length bits 
 #Truncates or pads as needed
 def pad_as_bitstring(num, length):
-    res = ''
-    bin_val = bin(num)[2:]
-    if len(bin_val) < length:
-        for i in range(length - len(bin_val)):
-            res = res + '0'
-    else:
-        bin_val = bin_val[:length]
-    for i in bin_val:
-        res = res + i 
-    return res
+    extra = max(num.bit_length() - length, 0) #truncation keeps the most significant bits
+    return BitVector(num >> extra, length).to_bitstring()
+
+#A binary vector of a given length packed into a Python integer
+#Bit 0 of the vector is the most significant bit of value, so the bit order matches bitstrings and sagemath row matrices
+#Addition is XOR, as for sagemath vectors over GF(2); concatenation is concat()
+class BitVector:
+    def __init__(self, value, length):
+        assert 0 <= value < (1 << length) or (value == 0 and length == 0)
+        self.value = value
+        self.length = length
+
+    #Takes as input a sagemath row matrix (or vector) over GF(2)
+    #Returns the same vector as a BitVector, packed from the NumPy bits of the matrix without going through one Python object per bit
+    @staticmethod
+    def from_sage(vec):
+        return BitVector.from_bits(np.asarray(vec.numpy(dtype=np.uint8)).ravel())
+
+    #Takes as input a NumPy array of bits (0 or 1)
+    #Returns the same vector as a BitVector
+    @staticmethod
+    def from_bits(bits):
+        length = len(bits)
+        return BitVector(int.from_bytes(np.packbits(bits).tobytes(), 'big') >> ((-length) % 8), length)
+
+    #Takes as input a bitstring of '0'/'1' characters
+    #Returns the same vector as a BitVector
+    @staticmethod
+    def from_bitstring(bitstring):
+        if len(bitstring) == 0:
+            return BitVector(0, 0)
+        return BitVector(int(bitstring, 2), len(bitstring))
+
+    #Returns the vector as a sagemath 1 * length matrix
+    def to_sage(self):
+        return matrix(GF(2), 1, self.length, self.to_bits().tolist())
+
+    #Returns the vector as a NumPy uint8 array of bits
+    def to_bits(self):
+        return np.unpackbits(np.frombuffer(self.to_bytes(), dtype=np.uint8))[:self.length]
+
+    #Returns the vector as a bitstring of '0'/'1' characters
+    def to_bitstring(self):
+        if self.length == 0:
+            return ''
+        return format(self.value, '0%db' % self.length)
+
+    #Returns the vector as bytes, most significant bit first, zero padded at the end to a whole number of bytes
+    def to_bytes(self):
+        pad = (-self.length) % 8
+        return (self.value << pad).to_bytes((self.length + pad) // 8, 'big')
+
+    #Returns the number of ones in the vector
+    def popcount(self):
+        return bin(self.value).count('1')
+
+    #Returns the concatenation of this vector followed by other
+    def concat(self, other):
+        return BitVector((self.value << other.length) | other.value, self.length + other.length)
+
+    #Returns the x most significant (leftmost) bits
+    def msb(self, x):
+        assert self.length >= x
+        return BitVector(self.value >> (self.length - x), x)
+
+    #Returns the x least significant (rightmost) bits
+    def lsb(self, x):
+        assert self.length >= x
+        return BitVector(self.value & ((1 << x) - 1), x)
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        return isinstance(other, BitVector) and self.length == other.length and self.value == other.value
+
+    def __hash__(self):
+        return hash((self.value, self.length))
+
+    def __xor__(self, other):
+        assert self.length == other.length
+        return BitVector(self.value ^ other.value, self.length)
+
+    __add__ = __xor__
+
+    #Indexing returns a single bit as an int, slicing (with step 1) returns a BitVector
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            assert step == 1
+            if stop <= start:
+                return BitVector(0, 0)
+            return BitVector((self.value >> (self.length - stop)) & ((1 << (stop - start)) - 1), stop - start)
+        if key < 0:
+            key = key + self.length
+        assert 0 <= key < self.length
+        return (self.value >> (self.length - 1 - key)) & 1
+
+    def __repr__(self):
+        return 'BitVector(%s)' % self.to_bitstring()
+
+#A bit stream of a given length held in a Python integer (bit 0 is the most significant bit, as in BitVector), read from a cursor pos
+#Reads past the end return only the bits that exist (as int() of a short slice of a bitstring would), and the cursor still moves by the full count
+class BitReader:
+    def __init__(self, value, length):
+        self.value = value
+        self.length = length
+        self.pos = 0
+
+    #Takes as input a bitstring of '0'/'1' characters
+    @staticmethod
+    def from_bitstring(bitstring):
+        if len(bitstring) == 0:
+            return BitReader(0, 0)
+        return BitReader(int(bitstring, 2), len(bitstring))
+
+    #Takes as input bytes (most significant bit first) and the number of bits to use from them (all by default)
+    @staticmethod
+    def from_bytes(data, length=None):
+        if length is None:
+            length = 8 * len(data)
+        return BitReader(int.from_bytes(data, 'big') >> (8 * len(data) - length), length)
+
+    #Takes as input a BitVector
+    @staticmethod
+    def from_bitvector(vec):
+        return BitReader(vec.value, vec.length)
+
+    #Returns the u bits from index start as an integer, without moving the cursor
+    #This is int(B[start:start + u], 2) for the bitstring B (0 for an empty slice), including a negative end counting from the end of B
+    def peek(self, u, start):
+        stop = start + u
+        if stop < 0:
+            stop = stop + self.length
+        stop = min(stop, self.length)
+        if start < 0 or stop <= start:
+            return 0
+        return (self.value >> (self.length - stop)) & ((1 << (stop - start)) - 1)
+
+    #Returns the next u bits as an integer and moves the cursor past them
+    def read(self, u):
+        x = self.peek(u, self.pos)
+        self.pos = self.pos + u
+        return x
+
+    def __len__(self):
+        return self.length
+
+#A bit stream built by appending fields; whole bytes go to a bytearray and only the last few bits stay in an integer accumulator
+class BitWriter:
+    def __init__(self):
+        self.buf = bytearray()
+        self.acc = 0
+        self.nacc = 0 #bits in acc
+        self.length = 0
+
+    #Appends the u least significant bits of x, most significant first
+    def write(self, x, u):
+        if u <= 0:
+            return
+        self.acc = (self.acc << u) | (x & ((1 << u) - 1))
+        self.nacc = self.nacc + u
+        self.length = self.length + u
+        if self.nacc >= 64:
+            rest = self.nacc & 7
+            self.buf += (self.acc >> rest).to_bytes(self.nacc >> 3, 'big')
+            self.acc = self.acc & ((1 << rest) - 1)
+            self.nacc = rest
 
-#Takes as inputs two vectors (sagemath 1 * ncols matrices) 
-#Returns their concatenation as a sagemath matrix
+    #Appends u ones (a unary code)
+    def write_ones(self, u):
+        self.write((1 << u) - 1, u)
+
+    def __len__(self):
+        return self.length
+
+    #Returns the stream as an integer (the first bit is the most significant)
+    def to_int(self):
+        return (int.from_bytes(self.buf, 'big') << self.nacc) | self.acc
+
+    def to_bitvector(self):
+        return BitVector(self.to_int(), self.length)
+
+    def to_bitstring(self):
+        return self.to_bitvector().to_bitstring()
+
+    #Returns the stream as bytes, zero padded at the end to a whole number of bytes
+    def to_bytes(self):
+        pad = (-self.nacc) % 8
+        return bytes(self.buf) + (self.acc << pad).to_bytes((self.nacc + pad) // 8, 'big')
+
+#Takes as inputs two vectors (sagemath 1 * ncols matrices or BitVectors) 
+#Returns their concatenation in the same representation
 def concat_vectors(v1, v2):
+    if isinstance(v1, BitVector):
+        return v1.concat(v2)
     assert v1.nrows() == 1 and v2.nrows() == 1
-    new_len = v1.ncols() + v2.ncols()
-    res = matrix(GF(2), 1, new_len)
-    len_1 = v1.ncols()
-    for i in range(new_len):
-        if i < len_1:
-            res[0, i] = v1[0, i]
-        else:
-            res[0, i] = v2[0, i - len_1]
-    return res
+    return v1.augment(v2)
+
+#Hash-input encodings for oracle_input
+#LEGACY_ENCODING is a zero byte followed by one byte (0 or 1) per bit, as built by concat_vectors_to_bytearray, vector_to_bytes and bitstring_to_bytes;
+#it is the default, so that ciphertexts made before the packed encoding still decrypt
+#PACKED_ENCODING is the version byte PACKED_VERSION followed, for each vector, by its bit length (4 bytes, big-endian) and its bits packed 8 per byte;
+#it has to be asked for, and a ciphertext must be decrypted with the encoding it was made with
+LEGACY_ENCODING = 'legacy'
+PACKED_ENCODING = 'packed'
+ENCODINGS = (LEGACY_ENCODING, PACKED_ENCODING)
+PACKED_VERSION = b'\x01'
+BIT_BYTES = bytes.maketrans(b'01', b'\x00\x01')
+
+#Takes as input a vector as a sagemath row matrix, a bitstring or a BitVector
+#Returns it as a BitVector (a BitVector is returned as is)
+def to_bitvector(vec):
+    if isinstance(vec, BitVector):
+        return vec
+    if isinstance(vec, str):
+        return BitVector.from_bitstring(vec)
+    return BitVector.from_sage(vec)
+
+#Takes as input a list of vectors (sagemath row matrices, bitstrings or BitVectors) and an encoding from ENCODINGS
+#Callers that hash the same vector more than once should pass it as a BitVector (see to_bitvector), so it is packed only once
+#Returns the hash input for the vectors as bytes
+@instrument.timed
+def oracle_input(vectors, encoding=LEGACY_ENCODING):
+    assert encoding in ENCODINGS
+    if encoding == LEGACY_ENCODING:
+        return b'\x00' + b''.join(to_bitvector(vec).to_bitstring().encode().translate(BIT_BYTES) for vec in vectors)
+    parts = [PACKED_VERSION]
+    for vec in vectors:
+        vec = to_bitvector(vec)
+        parts.append(vec.length.to_bytes(4, 'big'))
+        parts.append(vec.to_bytes())
+    return b''.join(parts)
 
 #Takes inputs two vectors (sagemath 1 * ncols matrix) 
 #Returns a bytearray of the concatenation of these vectors
 def concat_vectors_to_bytearray(vec1, vec2):
-    cc = bytearray(b'\x00')
-    for i in vec1[0]:
-        cc.append(i)
-    for i in vec2[0]:
-        cc.append(i)
-    return cc
-
-#Takes as input a vector (sagemath row matrix)
+    return bytearray(b'\x00' + to_bitvector(vec1).concat(to_bitvector(vec2)).to_bits().tobytes())
+
+#Takes as input a vector (sagemath row matrix or BitVector)
 #Returns the bitstring (elements of the vector concatenated into a string)    
 def vector_to_bitstring(vec):
-    B = ''
-    for bit in vec[0]:
-        B = B + str(bit)
-    return B
+    return to_bitvector(vec).to_bitstring()
     
 #Takes as input a single vector (sagemath 1 * ncols matrix) 
 #Returns the bytearray conversion of the vector   
 def vector_to_bytes(vec):
-    cc = bytearray(b'\x00')
-    for i in vec[0]:
-        cc.append(i)
-    return cc
+    return bytearray(b'\x00' + to_bitvector(vec).to_bits().tobytes())
 
 #Takes an input sagemath row matrix vec 
 #Returns the run-length encoding of the bitstring, i.e, the number of consecutive 0s preceding each occurrence of 1, as a list
 def vector_to_positional(vec):
-    delta_lst = []
-    ctr = 0
-    for ele in vec[0]:
-        if int(ele) == 1:
-            delta_lst.append(ctr)
-            ctr = 0
-        else:
-            ctr = ctr + 1
-    return delta_lst
+    return bitvector_to_positional(to_bitvector(vec))
+
+#Takes as input a BitVector
+#Returns its run-length encoding, read off the gaps between the positions of its ones
+def bitvector_to_positional(vec):
+    ones = np.flatnonzero(vec.to_bits())
+    return (np.diff(ones, prepend=-1) - 1).tolist()
     
 #Takes as input bitstring
 #Returns the bitstring as a vector (sagemath row matrix)
 def bitstring_to_vector(bitstring):
-    n = len(bitstring)
-    vec = matrix(GF(2), 1, n)
-    for i in range(n):
-        vec[0, i] = int(bitstring[i])
-    return vec
+    return BitVector.from_bitstring(bitstring).to_sage()
 
 #Takes an input bitstring 
 #Returns the bitstring as a bytearray    
 def bitstring_to_bytes(bitstring):
-    cc = bytearray(b'\x00')
-    for i in bitstring:
-        cc.append(int(i))
-    return cc
+    return bytearray(b'\x00' + bitstring.encode().translate(BIT_BYTES))
 
 #Takes an input bitstring 
 #Returns the run-length encoding of the bitstring
 def bitstring_to_positional(bitstring):
-    delta_lst = []
-    ctr = 0
-    for ele in bitstring:
-        if int(ele) == 1:
-            delta_lst.append(ctr)
-            ctr = 0
-        else:
-            ctr = ctr + 1
-    return delta_lst
+    return bitvector_to_positional(BitVector.from_bitstring(bitstring))
 
 #Takes as input a bitlength n and list delta_lst of run-length encodings as above 
 #Returns a sagemath row matrix of the corresponding bitstring. 
 def positional_to_vector(delta_lst, n):
-    z = matrix(GF(2), 1, n)
+    return positional_to_bitvector(delta_lst, n).to_sage()
+
+#Takes as input a bitlength n and list delta_lst of run-length encodings as above 
+#Returns the corresponding BitVector
+def positional_to_bitvector(delta_lst, n):
+    value = 0
     ctr = 0
     for d in delta_lst:
         ctr = ctr + d
-        z[0, ctr] = 1
+        value = value | (1 << (n - 1 - ctr))
         ctr = ctr + 1
-    return z      
+    return BitVector(value, n)
     
 #Takes as input a bitlength n and list delta_lst of run-length encodings i.e, the number of consecutive 0s preceding each occurrence of 1
 #Returns the corresponding bitstring 
 def positional_to_bitstring(delta_lst, n):
-    print('res', delta_lst)
-    bitstring = ''
-    delpos = 0
-    ctr = 0
-    for i in range(n):
-        if ctr == delta_lst[delpos]:
-            bitstring = bitstring + '1'
-            delpos = delpos + 1
-            ctr = 0
-        else:
-            bitstring = bitstring + '0'
-            ctr = ctr + 1
-    assert len(bitstring) == n        
-    return bitstring  
-
-#Takes as input a vector (sagemath row matrix) vec and an integer x 
-#Returns a new vector (sagemath row matrix) consisting of the x least significant bits of vec    
+    return positional_to_bitvector(delta_lst, n).to_bitstring()
+
+#Takes as input a vector (sagemath row matrix or BitVector) vec and an integer x 
+#Returns a new vector of the same kind consisting of the x least significant bits of vec    
 def LSB(vec, x):
+    if isinstance(vec, BitVector):
+        return vec.lsb(x)
     assert vec.ncols() >= x
-    res = matrix(GF(2), 1, x)
     start = vec.ncols() - x 
-    for i in range(x):
-        res[0, i] = vec[0, i + start]
-    return res 
+    return vec.submatrix(0, start, 1, x)
 
-#Takes as input a vector (sagemath row matrix) vec and an integer x 
-#Returns a new vector (sagemath row matrix) consisting of the x most significant bits of vec        
+#Takes as input a vector (sagemath row matrix or BitVector) vec and an integer x 
+#Returns a new vector of the same kind consisting of the x most significant bits of vec        
 def MSB(vec, x):
+    if isinstance(vec, BitVector):
+        return vec.msb(x)
     assert vec.ncols() >= x 
-    res = matrix(GF(2), 1, x)
-    for i in range(x):
-        res[0, i] = vec[0, i]
-    return res
+    return vec.submatrix(0, 0, 1, x)
+
+#Takes as input n, t
+#Returns (nct, bitlength, bytelength): nct = C(n, t) computed exactly with integers, bitlength = ceil(log2(nct)) bits to hold 0..nct-1,
+#and bytelength = ceil(bitlength / 8); cached, so each parameter set computes them once
+@lru_cache(maxsize=None)
+def binomial_params(n, t):
+    nct = comb(n, t)
+    bitlength = (nct - 1).bit_length()
+    bytelength = (bitlength + 7) // 8
+    return nct, bitlength, bytelength
+
+#Customization strings of the oracles H, H1 and R
+H_CUSTOM = b'Hash function to Random Oracle as integer'
+H1_CUSTOM = b'Hash function to Random Oracle as bitstring'
+R_CUSTOM = b'Random Oracle R'
+
+#Takes as input a customization string, the input (as bytes) and a number of bytes
+#Returns the first bytelength bytes of the cSHAKE256 XOF output of the input
+@instrument.timed
+def squeeze(custom, data, bytelength):
+    shake = cSHAKE256.new(custom=custom)
+    shake.update(data)
+    return shake.read(bytelength)
+
+#The hash oracles below read their outputs straight from the XOF bytes with int.from_bytes instead of going through hex strings
 
 #Takes as input a bitstring (as bytes), n, t 
-#Returns the cSHAKE256 XOF output of the bitstring in C(n,t) bits as an integer
+#Returns the cSHAKE256 XOF output of the bitstring in C(n,t) bits as an integer (modulo C(n, t))
 def H(bitstring, n, t):
-    nct = int(ceil(factorial(n)/(factorial(t) * factorial(n-t))))
-    bitlength = int(ceil(log(nct, 2).n()))
-    bytelength = int(ceil(bitlength / 8))
-    secret = b'Hash function to Random Oracle as integer'
-    
-    shake = cSHAKE256.new(custom=secret)
-    shake.update(bitstring)
-    h = shake.read(bytelength).hex()
-    h = int(h, 16) % nct
-    #print(nct)
-    return h
+    nct, bitlength, bytelength = binomial_params(n, t)
+    return int.from_bytes(squeeze(H_CUSTOM, bitstring, bytelength), 'big') % nct
+
+#Takes as input a bitstring (as bytes), and a bitlength k to hash to 
+#Returns the cSHAKE256 XOF output of the bitstring in k bits as a BitVector
+def H1_bitvector(bitstring, k):
+    h = int.from_bytes(squeeze(H1_CUSTOM, bitstring, (k + 7) // 8), 'big')
+    return BitVector(h & ((1 << k) - 1), k)
 
 #Takes as input a bitstring (as bytes), and a bitlength k to hash to 
 #Returns the cSHAKE256 XOF output of the bitstring in k bits as a bitstring 
 def H1(bitstring, k):
-    bytelength = int(ceil(k / 8))
-    
-    secret = b'Hash function to Random Oracle as bitstring'
-    shake = cSHAKE256.new(custom=secret)
-    shake.update(bitstring)
-    h = shake.read(bytelength).hex()
-    h = int(h, 16) % (2 ** k)
-    binh = pad_as_bitstring(h, k)
-    return binh
+    return H1_bitvector(bitstring, k).to_bitstring()
+
+#Takes as input a bitstring r (as bytes) and a bitlength k to hash to 
+#Returns the cSHAKE256 XOF of the bitstring in k bits as a BitVector (the leading bits of the output read as an integer, as pad_as_list does)
+def R_bitvector(r, k):
+    h = int.from_bytes(squeeze(R_CUSTOM, r, (k + 7) // 8), 'big')
+    extra = max(h.bit_length() - k, 0)
+    return BitVector(h >> extra, k)
 
 #Takes as input a bitstring r (as bytes) and a bitlength k to hash to 
 #Returns the cSHAKE256 XOF of the bitstring in k bits as a sagemath matrix 
 def R(r, k):
-    bytelength = int(ceil(k / 8))
-    secret = b'Random Oracle R'
-    shake = cSHAKE256.new(custom=secret)
-    shake.update(r)
-    h_hex = shake.read(bytelength).hex()
-    h_list = pad_as_list(int(h_hex, 16), k)
-    h_vec = matrix(GF(2), h_list)
-    return h_vec
+    return R_bitvector(r, k).to_sage()
 
 def test_positional_vector_interconversion():
     num_iter = 10000
@@ -247,4 +453,63 @@ def test_positional_vector_interconversion():
             print("Failure!", v, lv, lv2)
             break
     
-#test_positional_vector_interconversion()
\ No newline at end of file
+def test_bitvector():
+    num_iter = 1000
+    
+    for i in range(num_iter):
+        n1 = randrange(1, 300)
+        n2 = randrange(1, 300)
+        v1 = random_matrix(GF(2), 1, n1)
+        v2 = random_matrix(GF(2), 1, n2)
+        w = random_matrix(GF(2), 1, n1)
+        b1 = BitVector.from_sage(v1)
+        b2 = BitVector.from_sage(v2)
+        assert b1.to_sage() == v1
+        assert concat_vectors(b1, b2).to_sage() == concat_vectors(v1, v2)
+        assert (b1 + BitVector.from_sage(w)).to_sage() == v1 + w
+        assert b1.popcount() == vector(v1).hamming_weight()
+        x = randrange(n1 + 1)
+        assert LSB(b1, x).to_sage() == LSB(v1, x)
+        assert MSB(b1, x).to_sage() == MSB(v1, x)
+        assert vector_to_bitstring(b1) == vector_to_bitstring(v1)
+        assert bitstring_to_vector(vector_to_bitstring(v1)) == v1
+
+def test_bitstream():
+    num_iter = 1000
+    
+    for i in range(num_iter):
+        fields = [(randrange(2 ** 70), randrange(70)) for j in range(randrange(20))]
+        w = BitWriter()
+        B = ''
+        for x, u in fields:
+            w.write(x, u)
+            if u > 0:
+                B = B + pad_as_bitstring(x % (2 ** u), u)
+        assert len(w) == len(B) and w.to_bitstring() == B
+        assert BitReader.from_bytes(w.to_bytes(), len(w)).value == w.to_int()
+        r = BitReader.from_bitstring(B)
+        for j in range(10):
+            u = randrange(-2, 80)
+            start = randrange(-2, len(B) + 5)
+            substr = B[start:start + u]
+            assert r.peek(u, start) == (int(substr, 2) if start >= 0 and len(substr) > 0 else 0)
+    
+def test_oracle_input():
+    for i in range(100):
+        v1 = random_matrix(GF(2), 1, randrange(1, 300))
+        v2 = random_matrix(GF(2), 1, randrange(1, 300))
+        b = vector_to_bitstring(v1)
+        assert oracle_input([v1, v2], LEGACY_ENCODING) == bytes(concat_vectors_to_bytearray(v1, v2))
+        assert oracle_input([v1, v2], LEGACY_ENCODING) == b'\x00' + bytes(int(x) for x in v1.list() + v2.list())
+        assert oracle_input([v1], LEGACY_ENCODING) == bytes(vector_to_bytes(v1))
+        assert oracle_input([b], LEGACY_ENCODING) == bytes(bitstring_to_bytes(b))
+        assert oracle_input([v1, v2]) == oracle_input([v1, v2], LEGACY_ENCODING)
+        packed = oracle_input([v1, BitVector.from_sage(v2)], PACKED_ENCODING)
+        assert packed == oracle_input([b, vector_to_bitstring(v2)], PACKED_ENCODING)
+        assert BitVector.from_sage(v1).to_sage() == v1
+        assert len(packed) == 9 + (v1.ncols() + 7) // 8 + (v2.ncols() + 7) // 8
+    
+#test_positional_vector_interconversion()
+#test_bitvector()
+#test_bitstream()
+#test_oracle_input()
\ No newline at end of file
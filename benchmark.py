@@ -0,0 +1,225 @@
+'''
+Author: Nishka Dasgupta
+
+The benchmark runner for the whole package: key generation (cold and from a keypool), Classic McEliece (single and batch encryption, decryption
+and the two approximant algorithms of the interpolation decoder), every CCA2 conversion (single and batch encryption, decryption) and the two
+string-to-constant-weight-vector conversions (including the batched StC), over the standard parameter sets. Every operation is run for some
+warmup iterations, then timed over several repetitions of a number of iterations each; the per-operation times of the repetitions are summarised
+(min, median, mean, max) and can be written as JSON and compared with an earlier JSON file to spot regressions.
+
+Usage (from the package directory):
+    sage -python benchmark.py [--schemes classic fo_ideal ...] [--params 1024,38,10 ...] [--iterations 10] [--repetitions 5] [--warmup 1]
+                              [--decoder interpolation|syndrome] [--output results.json] [--baseline old.json] [--threshold 0.1]
+The exit status is 1 if the comparison with the baseline finds a regression.
+
+Functions:
+ - scheme_operations: Set up one scheme for one parameter set and return its operations
+ - time_operation: Time one operation with warmup and repetitions
+ - run: Run the benchmarks for a list of schemes and parameter sets
+ - compare: Compare results with a baseline and return the regressions
+ - main: Command line entry point
+'''
+
+from sage.all_cmdline import *   # import sage library
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+import classic
+import bernstein
+import cca_conversions
+import sendrier
+import ideal_stc
+import auxiliary
+
+#The standard parameter sets (n, t, m)
+PARAMETER_SETS = [(1024, 38, 10), (2048, 69, 11), (4096, 128, 12)]
+
+#The benchmarked schemes
+SCHEMES = ('keygen', 'classic', 'fo_sendrier', 'fo_ideal', 'alt_fo', 'kobara_imai_alpha', 'sendrier_conversion', 'ideal_conversion')
+
+#Depth of the keypool.KeyPool whose checkouts are timed by the keygen scheme
+POOL_DEPTH = 4
+
+#Number of messages (or strings) per call of the batch operations; their times are per call, not per message
+BATCH_SIZE = 16
+
+#Encryption, decryption and batch encryption functions of the CCA2 schemes
+CCA_FUNCTIONS = {
+    'fo_sendrier': (cca_conversions.fujisaki_okamoto_encrypt_sendrier, cca_conversions.fujisaki_okamoto_decrypt_sendrier,
+                    cca_conversions.fujisaki_okamoto_encrypt_sendrier_batch),
+    'fo_ideal': (cca_conversions.fujisaki_okamoto_encrypt_ideal, cca_conversions.fujisaki_okamoto_decrypt_ideal,
+                 cca_conversions.fujisaki_okamoto_encrypt_ideal_batch),
+    'alt_fo': (cca_conversions.alt_fujisaki_okamoto_encrypt, cca_conversions.alt_fujisaki_okamoto_decrypt,
+               cca_conversions.alt_fujisaki_okamoto_encrypt_batch),
+    'kobara_imai_alpha': (cca_conversions.kobara_imai_alpha_encrypt, cca_conversions.kobara_imai_alpha_decrypt,
+                          cca_conversions.kobara_imai_alpha_encrypt_batch),
+}
+
+#Takes as input a scheme from SCHEMES, the parameters n, t, m, a keypair for them (from classic.keygen) and the decoder for decryption
+#Returns (operations, cleanup): operations is a list of (operation name, function, setup), where each function runs the operation once
+#(and checks its result) and setup (or None) is run untimed before each repetition; cleanup (or None) releases what the operations started
+#The operations are meant to be timed in order, one after the other
+def scheme_operations(scheme, n, t, m, keypair, decoder='interpolation'):
+    pk, sk = keypair
+    k = classic.public_key_dimensions(pk)[1]
+    if scheme == 'keygen':
+        import keypool
+        pools = []
+        #The pool is started by the setup of the checkout operation, after the cold keygen repetitions,
+        #so that its worker processes do not compete with the cold keygen for the CPU
+        def fill_pool():
+            if len(pools) == 0:
+                pools.append(keypool.KeyPool(n, t, m, POOL_DEPTH))
+            pools[0].wait_full()
+        def checkout():
+            pools[0].checkout()
+        def close_pool():
+            for pool in pools:
+                pool.close()
+        return [('keygen', lambda: classic.keygen(n, t, m), None),
+                ('pool_checkout', checkout, fill_pool)], close_pool
+    if scheme == 'classic':
+        ctx = classic.decryption_context(sk, pk, decoder)
+        msg = random_matrix(GF(2), 1, k)
+        z = matrix(GF(2), 1, n)
+        classic.select_error(z, t, n)
+        c = classic.encrypt(msg, z, pk)
+        def encrypt():
+            e = matrix(GF(2), 1, n)
+            classic.select_error(e, t, n)
+            classic.encrypt(msg, e, pk)
+        def decrypt():
+            d, e = classic.decrypt(c, sk, pk, ctx)
+            assert d == msg
+        M = random_matrix(GF(2), BATCH_SIZE, k)
+        def encrypt_batch():
+            Z = matrix(GF(2), BATCH_SIZE, n)
+            for i in range(BATCH_SIZE):
+                e = matrix(GF(2), 1, n)
+                classic.select_error(e, t, n)
+                Z.set_row(i, e.row(0))
+            classic.encrypt_batch(M, Z, pk)
+        #The key equation of the interpolation decoder, solved by extended Euclid and by the original kernel computation
+        g, L, F = sk[2]
+        A = bernstein.subproduct_tree(F, L)[-1][0]
+        B = F['x']([F.random_element() for j in range(n)])
+        return [('encrypt', encrypt, None), ('encrypt_batch', encrypt_batch, None), ('decrypt', decrypt, None),
+                ('approximant', lambda: bernstein.approximant(t, F, A, B), None),
+                ('approximant_kernel', lambda: bernstein.approximant_kernel(t, F, A, B), None)], None
+    if scheme in CCA_FUNCTIONS:
+        enc, dec, enc_batch = CCA_FUNCTIONS[scheme]
+        ctx = classic.decryption_context(sk, pk, decoder)
+        msg = random_matrix(GF(2), 1, k)
+        c1, c2 = enc(msg, n, k, pk)
+        def decrypt():
+            assert dec(c1, c2, pk, sk, ctx) == msg
+        M = random_matrix(GF(2), BATCH_SIZE, k)
+        return [('encrypt', lambda: enc(msg, n, k, pk), None), ('encrypt_batch', lambda: enc_batch(M, n, k, pk), None),
+                ('decrypt', decrypt, None)], None
+    if scheme == 'sendrier_conversion':
+        bitlength = auxiliary.binomial_params(n, t)[1]
+        B = ''.join(str(randrange(2)) for j in range(bitlength))
+        delta_tuple = tuple(sendrier.BtoCW(n, t, 0, B, 0))
+        return [('BtoCW', lambda: sendrier.BtoCW(n, t, 0, B, 0), None),
+                ('CWtoB', lambda: sendrier.CWtoB(n, t, delta_tuple), None)], None
+    if scheme == 'ideal_conversion':
+        l, d = ideal_stc.fix_l_d(n, t)
+        B = ''.join(str(randrange(2)) for j in range(l))
+        lv = ideal_stc.StC(B, d, n, t)
+        Bs = [''.join(str(randrange(2)) for j in range(l)) for i in range(BATCH_SIZE)]
+        return [('StC', lambda: ideal_stc.StC(B, d, n, t), None),
+                ('StC_batch', lambda: ideal_stc.StC_batch(Bs, d, n, t), None),
+                ('CtS', lambda: ideal_stc.CtS(lv, d, n, t, l), None)], None
+    raise ValueError('unknown scheme %s' % scheme)
+
+#Takes as input a function, the number of iterations per repetition, the number of repetitions and warmup iterations, and an optional setup
+#Returns a dict with the time per call (in seconds) of each repetition and their min, median, mean and max
+def time_operation(fn, iterations, repetitions, warmup, setup=None):
+    for i in range(warmup):
+        fn()
+    samples = []
+    for rep in range(repetitions):
+        if setup is not None:
+            setup()
+        start = timeit.default_timer()
+        for i in range(iterations):
+            fn()
+        stop = timeit.default_timer()
+        samples.append((stop - start) / iterations)
+    return {'samples': samples, 'min': min(samples), 'median': statistics.median(samples),
+            'mean': statistics.mean(samples), 'max': max(samples), 'iterations': iterations}
+
+#Takes as input lists of schemes and parameter sets and the timing settings
+#Returns the results as a dict: 'meta' describes the run, 'results' maps 'scheme/n-t-m/operation' to the output of time_operation
+def run(schemes, param_sets, iterations, repetitions, warmup, decoder='interpolation'):
+    results = {}
+    for (n, t, m) in param_sets:
+        print("Parameters n =", n, "t =", t, "m =", m)
+        keypair = classic.keygen(n, t, m)
+        for scheme in schemes:
+            operations, cleanup = scheme_operations(scheme, n, t, m, keypair, decoder)
+            try:
+                for name, fn, setup in operations:
+                    key = '%s/%d-%d-%d/%s' % (scheme, n, t, m, name)
+                    #keypool checkouts need a full pool for every timed iteration
+                    its = iterations
+                    if name == 'pool_checkout':
+                        its = min(iterations, POOL_DEPTH)
+                    results[key] = time_operation(fn, its, repetitions, warmup if setup is None else 0, setup)
+                    print("  %-45s median %.6f s" % (key, results[key]['median']))
+            finally:
+                if cleanup is not None:
+                    cleanup()
+    meta = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(), 'machine': platform.platform(),
+            'iterations': iterations, 'repetitions': repetitions, 'warmup': warmup, 'decoder': decoder}
+    return {'meta': meta, 'results': results}
+
+#Takes as input the output of run, a baseline in the same format (e.g. loaded from an earlier JSON file) and a relative threshold
+#Returns the list of (key, baseline median, new median, ratio) for the operations whose median time grew by more than the threshold
+def compare(results, baseline, threshold=0.1):
+    regressions = []
+    for key, new in sorted(results['results'].items()):
+        if key not in baseline['results']:
+            continue
+        old = baseline['results'][key]['median']
+        ratio = new['median'] / old if old > 0 else float('inf')
+        print("  %-45s %.6f -> %.6f s (x%.2f)" % (key, old, new['median'], ratio))
+        if ratio > 1 + threshold:
+            regressions.append((key, old, new['median'], ratio))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the McEliece schemes')
+    parser.add_argument('--schemes', nargs='+', choices=SCHEMES, default=list(SCHEMES))
+    parser.add_argument('--params', nargs='+', default=['%d,%d,%d' % p for p in PARAMETER_SETS], help='parameter sets as n,t,m')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--decoder', choices=classic.DECODERS, default='interpolation')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown of the median reported as a regression')
+    args = parser.parse_args(argv)
+    param_sets = [tuple(int(x) for x in p.split(',')) for p in args.params]
+    results = run(args.schemes, param_sets, args.iterations, args.repetitions, args.warmup, args.decoder)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print("Comparison with", args.baseline)
+        regressions = compare(results, baseline, args.threshold)
+        for key, old, new, ratio in regressions:
+            print("Regression:", key, "is x%.2f slower" % ratio)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
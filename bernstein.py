@@ -3,18 +3,75 @@ This file was *autogenerated* from the file bernstein.sage
 sage code taken from Daniel J. Bernstein. Understanding binary-Goppa decoding. Cryptology ePrint Archive, Paper 2022/473. https://eprint.iacr.org/2022/473. 2022.
 '''
 from sage.all_cmdline import *   # import sage library
+import additive_fft
+import instrument
 
-_sage_const_0 = Integer(0); _sage_const_1 = Integer(1); _sage_const_2 = Integer(2); _sage_const_100 = Integer(100); _sage_const_3 = Integer(3); _sage_const_10 = Integer(10)
-def interpolator(n,k,a,r):
+_sage_const_0 = Integer(0); _sage_const_1 = Integer(1); _sage_const_2 = Integer(2); _sage_const_100 = Integer(100); _sage_const_3 = Integer(3); _sage_const_10 = Integer(10); _sage_const_38 = Integer(38); _sage_const_69 = Integer(69); _sage_const_128 = Integer(128); _sage_const_11 = Integer(11); _sage_const_12 = Integer(12); _sage_const_1024 = Integer(1024); _sage_const_2048 = Integer(2048); _sage_const_4096 = Integer(4096)
+def subproduct_tree(k,a):
+	# levels[0] are the leaves x-a[i], each level multiplies neighbouring pairs, levels[-1] == [prod(x-a[i])]
+	a = list(a)
+	assert k.is_field() and len(a) >= _sage_const_1 
+	kpoly = k['x']
+	levels = [[kpoly([-aj,_sage_const_1 ]) for aj in a]]
+	while len(levels[-_sage_const_1 ]) > _sage_const_1 :
+		level = levels[-_sage_const_1 ]
+		levels.append([level[i]*level[i+_sage_const_1 ] if i+_sage_const_1  < len(level) else level[i] for i in range(_sage_const_0 ,len(level),_sage_const_2 )])
+	return levels
+
+def tree_evaluate(levels,f):
+	# remainder tree: returns [f(a[i]) for all i]
+	rems = [f % levels[-_sage_const_1 ][_sage_const_0 ]]
+	for level in reversed(levels[:-_sage_const_1 ]):
+		rems = [rems[i//_sage_const_2 ] % level[i] for i in range(len(level))]
+	return [ri[_sage_const_0 ] for ri in rems]
+
+def tree_combine(levels,c):
+	# returns sum(c[i]*A//(x-a[i])) where A = prod(x-a[i]), merging up the tree
+	kpoly = levels[_sage_const_0 ][_sage_const_0 ].parent()
+	vals = [kpoly(ci) for ci in c]
+	for level in levels[:-_sage_const_1 ]:
+		vals = [vals[i]*level[i+_sage_const_1 ]+vals[i+_sage_const_1 ]*level[i] if i+_sage_const_1  < len(level) else vals[i] for i in range(_sage_const_0 ,len(level),_sage_const_2 )]
+	return vals[_sage_const_0 ]
+
+def interpolation_tree(k,a):
+	# everything interpolator needs that depends only on a: the subproduct tree and Aprime(a[i]) for all i
+	levels = subproduct_tree(k,a)
+	Aprime = levels[-_sage_const_1 ][_sage_const_0 ].derivative()
+	return levels,tree_evaluate(levels,Aprime)
+
+def interpolator(n,k,a,r,tree=None):
 	a,r = list(a),list(r)
 	assert k.is_field()
 	assert len(a) == n and len(set(a)) == n and len(r) == n
 	kpoly = k['x']; (x,) = kpoly._first_ngens(1)
+	if tree is not None:
+		# tree = interpolation_tree(k,a), reused across calls with the same a
+		levels,Aprime_values = tree
+		return kpoly(tree_combine(levels,[r[i]/Aprime_values[i] for i in range(n)]))
 	A = kpoly(prod(x-a[j] for j in range(n)))
 	Aprime = A.derivative()
 	return kpoly(sum(((r[i]/Aprime(a[i]))*(A//(x-a[i]))) for i in range(n)))
 
 def approximant(t,k,A,B):
+	# extended Euclid on (A,B), stopped at the first remainder r1 = s1*A+u1*B of degree < n-t
+	# then a = u1 has degree <= t, b = -s1 has degree < t, and a*B-b*A = r1 (same pair as approximant_kernel up to a constant)
+	assert t >= _sage_const_0  and A.base_ring() == k and B.base_ring() == k
+	kpoly,n = A.parent(),A.degree()
+	assert n > B.degree()
+	r0,r1 = A,B
+	s0,s1 = kpoly(_sage_const_1 ),kpoly(_sage_const_0 )
+	u0,u1 = kpoly(_sage_const_0 ),kpoly(_sage_const_1 )
+	while r1 != _sage_const_0  and r1.degree() >= n-t:
+		q,r = r0.quo_rem(r1)
+		r0,r1 = r1,r
+		s0,s1 = s1,s0-q*s1
+		u0,u1 = u1,u0-q*u1
+	a,b = u1,-s1
+	d = gcd(a,b)
+	return a//d,b//d
+
+def approximant_kernel(t,k,A,B):
+	# the original approximant: a right-kernel vector of a 2t*(2t+1) matrix over k (cubic in t)
 	assert t >= _sage_const_0  and A.base_ring() == k and B.base_ring() == k
 	kpoly,n = A.parent(),A.degree()
 	assert n > B.degree()
@@ -54,6 +111,38 @@ def goppa_errors(n,t,k,alpha,g,r):
 			if a*B-b*A == _sage_const_0  or (a*B-b*A).degree() < n-_sage_const_2 *t+a.degree():
 				return [k(a(alpha[j]) == _sage_const_0 ) for j in range(n)]
 
+def goppa_decoder(n,t,k,alpha,g):
+	# everything goppa_errors computes from the key alone, validated once:
+	# A = prod(x-alpha[j]) with its subproduct tree, the scales 1/g(alpha[i])^2, g^2 and the additive FFT points
+	alpha = list(alpha)
+	assert k.is_field() and k.characteristic() == _sage_const_2 
+	assert g.base_ring() == k and g.degree() == t and g.is_squarefree()
+	assert len(alpha) == n and len(set(alpha)) == n and n >= _sage_const_1 
+	kpoly = g.parent()
+	levels = subproduct_tree(k,alpha)
+	A = kpoly(levels[-_sage_const_1 ][_sage_const_0 ])
+	scale = [_sage_const_1 /g(alpha[i])**_sage_const_2  for i in range(n)] # rtwist[i] = r[i]*Aprime(alpha[i])/g(alpha[i])^2, and the interpolator divides by Aprime(alpha[i]) again
+	points = additive_fft.evaluation_points(k,alpha)
+	return {'n':n,'t':t,'k':k,'alpha':alpha,'g':g,'g2':g**_sage_const_2 ,'A':A,'levels':levels,'scale':scale,'points':points}
+
+def goppa_decode(decoder,r):
+	# goppa_errors(n,t,k,alpha,g,r) for decoder = goppa_decoder(n,t,k,alpha,g), doing only the work that depends on r
+	n,t,k,A = decoder['n'],decoder['t'],decoder['k'],decoder['A']
+	r = list(r)
+	assert len(r) == n
+	kpoly = A.parent()
+	scale = decoder['scale']
+	with instrument.span('bernstein.goppa_decode.interpolate'):
+		B = kpoly(tree_combine(decoder['levels'],[r[i]*scale[i] for i in range(n)]))
+	with instrument.span('bernstein.goppa_decode.approximant'):
+		a,b = approximant(t,k,A,B)
+	with instrument.span('bernstein.goppa_decode.roots'):
+		aprime = a.derivative()
+		if a.divides(A):
+			if a.divides(decoder['g2']*b-aprime):
+				if a*B-b*A == _sage_const_0  or (a*B-b*A).degree() < n-_sage_const_2 *t+a.degree():
+					return [k(aj == _sage_const_0 ) for aj in additive_fft.evaluate_on_support(a.list(),decoder['points'])]
+
 def test_interpolator():	
 	for q in range(_sage_const_100 ):
 		q = ZZ(q)
@@ -74,6 +163,26 @@ def test_interpolator():
 			kpoly = phi.parent()
 			assert phi == kpoly.lagrange_polynomial(zip(a,r))
 
+def test_interpolation_tree():
+	for q in range(_sage_const_100 ):
+		q = ZZ(q)
+		if not q.is_prime_power(): 
+			continue
+		print('interpolation_tree %d' % q)
+		sys.stdout.flush()
+		k = GF(q)
+		for loop in range(_sage_const_10 ):
+			n = randrange(_sage_const_1 ,q+_sage_const_1 )
+			a = list(k)
+			shuffle(a)
+			a = a[:n]
+			tree = interpolation_tree(k,a)
+			for rloop in range(_sage_const_10 ):
+				r = [k.random_element() for j in range(n)]
+				assert interpolator(n,k,a,r,tree) == interpolator(n,k,a,r)
+			f = k['x'].random_element(randrange(_sage_const_2 *n))
+			assert tree_evaluate(tree[_sage_const_0 ],f) == [f(aj) for aj in a]
+
 def test_approximant():		
 	for q in range(_sage_const_100 ):
 		q = ZZ(q)
@@ -178,6 +287,8 @@ def test_goppa_errors():
 					e = 'unknown' # cut off data flow from previous iteration
 					r = [k.random_element() for j in range(n)]
 				e2 = goppa_errors(n,t,k,a,g,r)
+				if n > _sage_const_0 :
+					assert goppa_decode(goppa_decoder(n,t,k,a,g),r) == e2
 				if e2 == None:
 					assert not known
 				else:
@@ -186,4 +297,3 @@ def test_goppa_errors():
 						assert e2 == e
 					assert len([ej for ej in e2 if ej != _sage_const_0 ]) <= t
 					assert g.divides(sum((r[i]-e2[i])*A//(x-a[i]) for i in range(n)))
-
@@ -15,58 +15,100 @@ pp. 435–438. doi: 10.1109/ISIT.2005.1523371.
  
 Functions:
  - fujisaki_okamoto_encrypt_sendrier: Encrypt using Fujisaki-Okamoto conversion of Classic McEliece + Sendrier's Conversion
+ - fujisaki_okamoto_encrypt_sendrier_batch: Encrypt the rows of a message matrix with one McEliece matrix product
  - fujisaki_okamoto_decrypt_sendrier: Decrypt using Fujisaki-Okamoto conversion of Classic McEliece + Sendrier's Conversion
  - fujisaki_okamoto_encrypt_ideal: Encrypt using Fujisaki-Okamoto conversion of Classic McEliece + Barenghi-Pelosi's Conversion 
+ - fujisaki_okamoto_encrypt_ideal_batch: Encrypt the rows of a message matrix with one McEliece matrix product
  - fujisaki_okamoto_decrypt_ideal: Decrypt using Fujisaki-Okamoto conversion of Classic McEliece + Barenghi-Pelosi's Conversion 
  - alt_fujisaki_okamoto_encrypt: Encrypt using Cayrel et al's version of Fujisaki-Okamoto conversion of classic McEliece
+ - alt_fujisaki_okamoto_encrypt_batch: Encrypt the rows of a message matrix with one McEliece matrix product
  - alt_fujisaki_okamoto_decrypt: Decrypt using Cayrel et al's version of Fujisaki-Okamoto conversion of classic McEliece
  - kobara_imai_gamma_encrypt: Encrypt using Kobara-Imai's gamma protocol (DOES NOT WORK: unavailability of suitable conversion)
  - kobara_imai_alpha_encrypt: Encrypt using Kobara-Imai's alpha protocol 
+ - kobara_imai_alpha_encrypt_batch: Encrypt the rows of a message matrix with one McEliece matrix product
  - kobara_imai_alpha_decrypt: Decrypt using Kobara-Imai's alpha protocol
+ - init_decrypt_worker: Set up the key and decryption context once in a decrypt_batch worker process
+ - decrypt_worker: Decrypt one ciphertext in a decrypt_batch worker process
+ - decrypt_batch: Decrypt many ciphertexts of one scheme over a pool of worker processes
  - generate_all_error_vecs: Naive lexicographic generation of error vectors for McEliece
- - time_original_f_o: Runtime and tests for Fujisaki-Okamoto
- - time_alt_f_o: Runtime and tests for alt_fujisaki_okamoto
- - time_kobara_imai: Runtime and tests for Kobara-Imai alpha
+Timing of every scheme is done by benchmark.py
+The encryption and decryption functions are timed in instrument.py spans; their hashing, conversion and McEliece stages are the spans of
+auxiliary.py, sendrier.py, ideal_stc.py and classic.py that run inside them.
 '''
 
 from sage.all_cmdline import *   # import sage library
 from math import ceil, floor, log2
 import numpy as np
-import timeit
+import multiprocessing
 
 import classic
 import sendrier
 import ideal_stc
 import auxiliary
+import instrument
 
 error_vec_list = []
 
 #Encryption with the Fujisaki-Okamoto transform using Sendrier's function for converting bitstrings to constant-weight vectors
-def fujisaki_okamoto_encrypt_sendrier(m, n, k, pk):
+#Like all the *_encrypt functions below, encoding is the hash-input encoding (one of auxiliary.ENCODINGS) of the oracle inputs;
+#the default auxiliary.LEGACY_ENCODING is the original one, and auxiliary.PACKED_ENCODING has to be asked for
+#In the Fujisaki-Okamoto schemes r is hashed twice, so it is packed into a BitVector once
+@instrument.timed
+def fujisaki_okamoto_encrypt_sendrier(m, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
     t = pk[1]
     #Generate r
     r = random_matrix(GF(2), 1, k)
-    in1 = auxiliary.concat_vectors_to_bytearray(r, m)
+    rv = auxiliary.to_bitvector(r)
+    in1 = auxiliary.oracle_input([rv, m], encoding)
     z1 = bin(auxiliary.H(in1, n, t))[2:] #BtoCW takes binary strings as input 
     z2 = sendrier.BtoCW(n, t, 0, z1, 0)
     z = auxiliary.positional_to_vector(z2, n)
     assert vector(z).hamming_weight() == t
     c1 = classic.encrypt(r, z, pk)
-    in2 = auxiliary.vector_to_bytes(r)
+    in2 = auxiliary.oracle_input([rv], encoding)
     c2 = auxiliary.R(in2, k) + m
     return c1, c2
+
+#Batch version of fujisaki_okamoto_encrypt_sendrier: M is a b*k matrix of messages, one per row
+#The hashing and conversion are done row by row, and then all b McEliece encryptions are a single matrix product
+#Returns the b*n matrix C1 and the b*k matrix C2, whose rows are the (c1, c2) pairs of the messages
+@instrument.timed
+def fujisaki_okamoto_encrypt_sendrier_batch(M, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
+    t = pk[1]
+    b = M.nrows()
+    Rm = random_matrix(GF(2), b, k)
+    z_rows = []
+    pad_rows = []
+    for i in range(b):
+        r = Rm.submatrix(i, 0, 1, k)
+        m = M.submatrix(i, 0, 1, k)
+        rv = auxiliary.to_bitvector(r)
+        in1 = auxiliary.oracle_input([rv, m], encoding)
+        z1 = bin(auxiliary.H(in1, n, t))[2:]
+        z2 = sendrier.BtoCW(n, t, 0, z1, 0)
+        z = auxiliary.positional_to_vector(z2, n)
+        assert vector(z).hamming_weight() == t
+        z_rows.append(z.list())
+        in2 = auxiliary.oracle_input([rv], encoding)
+        pad_rows.append(auxiliary.R(in2, k).list())
+    C1 = classic.encrypt_batch(Rm, matrix(GF(2), b, n, z_rows), pk)
+    C2 = matrix(GF(2), b, k, pad_rows) + M
+    return C1, C2
     
 #Decryption with the Fujisaki-Okamoto transform using Sendrier's function for converting bitstrings to constant-weight vectors
-def fujisaki_okamoto_decrypt_sendrier(c1, c2, pk, sk):
-    k = pk[0].nrows()
-    n = pk[0].ncols()
+#Like all the *_decrypt functions below, ctx can be a precomputed classic.decryption_context(sk, pk), and encoding
+#(one of auxiliary.ENCODINGS) must be the hash-input encoding the ciphertext was made with
+@instrument.timed
+def fujisaki_okamoto_decrypt_sendrier(c1, c2, pk, sk, ctx=None, encoding=auxiliary.LEGACY_ENCODING):
+    n, k = classic.public_key_dimensions(pk)
     t = pk[1]
-    r, z = classic.decrypt(c1, sk, pk)
-    in2 = auxiliary.vector_to_bytes(r)
+    r, z = classic.decrypt(c1, sk, pk, ctx)
+    rv = auxiliary.to_bitvector(r)
+    in2 = auxiliary.oracle_input([rv], encoding)
     m = c2 + auxiliary.R(in2, k)
     
     #Now test 
-    in1 = auxiliary.concat_vectors_to_bytearray(r, m)
+    in1 = auxiliary.oracle_input([rv, m], encoding)
     z1 = bin(auxiliary.H(in1, n, t))[2:]
     z2 = sendrier.BtoCW(n, t, 0, z1, 0)
     expected_z = auxiliary.positional_to_vector(z2, n)
@@ -77,39 +119,66 @@ def fujisaki_okamoto_decrypt_sendrier(c1, c2, pk, sk):
         return None
 
 #Encryption with the Fujisaki-Okamoto transform using Barenghi and Pelosi's function for converting bitstrings to constant-weight vectors
-def fujisaki_okamoto_encrypt_ideal(m, n, k, pk):
+@instrument.timed
+def fujisaki_okamoto_encrypt_ideal(m, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
     t = pk[1]
     l, d = ideal_stc.fix_l_d(n, t)
     #Generate r
     r = random_matrix(GF(2), 1, k)
-    in1 = auxiliary.concat_vectors_to_bytearray(r, m)
-    aux = auxiliary.H1(in1, l)
+    rv = auxiliary.to_bitvector(r)
+    in1 = auxiliary.oracle_input([rv, m], encoding)
     B = auxiliary.H1(in1, l) #StC takes binary strings as input 
     lv = ideal_stc.StC(B, d, n, t)
     z = auxiliary.positional_to_vector(lv, n)
     assert vector(z).hamming_weight() == t
     c1 = classic.encrypt(r, z, pk)
-    in2 = auxiliary.vector_to_bytes(r)
+    in2 = auxiliary.oracle_input([rv], encoding)
     c2 = auxiliary.R(in2, k) + m
     return c1, c2
+
+#Batch version of fujisaki_okamoto_encrypt_ideal, with the same conventions as fujisaki_okamoto_encrypt_sendrier_batch
+@instrument.timed
+def fujisaki_okamoto_encrypt_ideal_batch(M, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
+    t = pk[1]
+    l, d = ideal_stc.fix_l_d(n, t)
+    b = M.nrows()
+    Rm = random_matrix(GF(2), b, k)
+    z_rows = []
+    pad_rows = []
+    for i in range(b):
+        r = Rm.submatrix(i, 0, 1, k)
+        m = M.submatrix(i, 0, 1, k)
+        rv = auxiliary.to_bitvector(r)
+        in1 = auxiliary.oracle_input([rv, m], encoding)
+        B = auxiliary.H1(in1, l)
+        lv = ideal_stc.StC(B, d, n, t)
+        z = auxiliary.positional_to_vector(lv, n)
+        assert vector(z).hamming_weight() == t
+        z_rows.append(z.list())
+        in2 = auxiliary.oracle_input([rv], encoding)
+        pad_rows.append(auxiliary.R(in2, k).list())
+    C1 = classic.encrypt_batch(Rm, matrix(GF(2), b, n, z_rows), pk)
+    C2 = matrix(GF(2), b, k, pad_rows) + M
+    return C1, C2
     
 #Decryption with the Fujisaki-Okamoto transform using Barenghi and Pelosi's function for converting bitstrings to constant-weight vectors
 #Since Conv() in the forward direction in this protocol is one-to-many/non-deterministic, we need to unconvert to check
-def fujisaki_okamoto_decrypt_ideal(c1, c2, pk, sk):
-    k = pk[0].nrows()
-    n = pk[0].ncols()
+@instrument.timed
+def fujisaki_okamoto_decrypt_ideal(c1, c2, pk, sk, ctx=None, encoding=auxiliary.LEGACY_ENCODING):
+    n, k = classic.public_key_dimensions(pk)
     t = pk[1]
     l, d = ideal_stc.fix_l_d(n, t)
     
-    r, z = classic.decrypt(c1, sk, pk)
-    in2 = auxiliary.vector_to_bytes(r)
+    r, z = classic.decrypt(c1, sk, pk, ctx)
+    rv = auxiliary.to_bitvector(r)
+    in2 = auxiliary.oracle_input([rv], encoding)
     m = c2 + auxiliary.R(in2, k)
         
     #Now test 
     lv = auxiliary.vector_to_positional(z)
     expected_B = ideal_stc.CtS(lv, d, t, n, l)[:l]
     
-    in1 = auxiliary.concat_vectors_to_bytearray(r, m)
+    in1 = auxiliary.oracle_input([rv, m], encoding)
     B = auxiliary.H1(in1, l)
     if B == expected_B:
         return m
@@ -117,30 +186,58 @@ def fujisaki_okamoto_decrypt_ideal(c1, c2, pk, sk):
         return None
 
 #Encryption with the Fujisaki-Okamoto transform that does not use the conversion function (from Cayrel et al)
-def alt_fujisaki_okamoto_encrypt(m, n, k, pk):
+@instrument.timed
+def alt_fujisaki_okamoto_encrypt(m, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
     t = pk[1]
     r = matrix(GF(2), 1, n)
     classic.select_error(r, t, n)
     assert vector(r).hamming_weight() == t
-    in1 = auxiliary.concat_vectors_to_bytearray(r, m)
-    z = auxiliary.bitstring_to_vector(auxiliary.H1(in1, k))
+    rv = auxiliary.to_bitvector(r)
+    in1 = auxiliary.oracle_input([rv, m], encoding)
+    z = auxiliary.H1_bitvector(in1, k).to_sage()
     c1 = classic.encrypt(z, r, pk)
-    in2 = auxiliary.vector_to_bytes(r)
+    in2 = auxiliary.oracle_input([rv], encoding)
     c2 = auxiliary.R(in2, k) + m
     return c1, c2
+
+#Batch version of alt_fujisaki_okamoto_encrypt, with the same conventions as fujisaki_okamoto_encrypt_sendrier_batch
+#Here the random error vectors form the error matrix and the hashed vectors form the message matrix of the McEliece product
+@instrument.timed
+def alt_fujisaki_okamoto_encrypt_batch(M, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
+    t = pk[1]
+    b = M.nrows()
+    r_rows = []
+    z_rows = []
+    pad_rows = []
+    for i in range(b):
+        m = M.submatrix(i, 0, 1, k)
+        r = matrix(GF(2), 1, n)
+        classic.select_error(r, t, n)
+        assert vector(r).hamming_weight() == t
+        rv = auxiliary.to_bitvector(r)
+        in1 = auxiliary.oracle_input([rv, m], encoding)
+        z = auxiliary.H1_bitvector(in1, k).to_sage()
+        r_rows.append(r.list())
+        z_rows.append(z.list())
+        in2 = auxiliary.oracle_input([rv], encoding)
+        pad_rows.append(auxiliary.R(in2, k).list())
+    C1 = classic.encrypt_batch(matrix(GF(2), b, k, z_rows), matrix(GF(2), b, n, r_rows), pk)
+    C2 = matrix(GF(2), b, k, pad_rows) + M
+    return C1, C2
     
 #Encryption with the Fujisaki-Okamoto transform that does not use the conversion function (from Cayrel et al)
-def alt_fujisaki_okamoto_decrypt(c1, c2, pk, sk):
-    k = pk[0].nrows()
-    n = pk[0].ncols()
+@instrument.timed
+def alt_fujisaki_okamoto_decrypt(c1, c2, pk, sk, ctx=None, encoding=auxiliary.LEGACY_ENCODING):
+    n, k = classic.public_key_dimensions(pk)
     t = pk[1]
-    z, r = classic.decrypt(c1, sk, pk)
-    in2 = auxiliary.vector_to_bytes(r)
+    z, r = classic.decrypt(c1, sk, pk, ctx)
+    rv = auxiliary.to_bitvector(r)
+    in2 = auxiliary.oracle_input([rv], encoding)
     m = c2 + auxiliary.R(in2, k)
     
     #Now test 
-    in1 = auxiliary.concat_vectors_to_bytearray(r, m)
-    expected_z = auxiliary.bitstring_to_vector(auxiliary.H1(in1, k))
+    in1 = auxiliary.oracle_input([rv, m], encoding)
+    expected_z = auxiliary.H1_bitvector(in1, k).to_sage()
     expected_c1 = classic.encrypt(expected_z, r, pk)
     if c1 == expected_c1 and z == expected_z:
         return m
@@ -150,14 +247,15 @@ def alt_fujisaki_okamoto_decrypt(c1, c2, pk, sk):
 #The Kobara-Imai gamma transform, implemented with the Barenghi-Pelosi conversion
 #Note that this does not work in its current form, as the Barenghi-Pelosi method requires bitstrings to be of length < log(C(n,t)) 
 #and the gamma transform sends inputs of length exactly log(C(n,t)) for conversion    
-def kobara_imai_gamma_encrypt(m, n, k, const, pk):
+@instrument.timed
+def kobara_imai_gamma_encrypt(m, n, k, const, pk, encoding=auxiliary.LEGACY_ENCODING):
     r_len = 160
     const_len = 160
     m_len = m.ncols()
     assert const.ncols() == const_len
     t = pk[1]
-    nct = int(ceil(factorial(n)/(factorial(t) * factorial(n-t))))
-    lognct = int(floor(log(nct, 2).n()))
+    nct = auxiliary.binomial_params(n, t)[0]
+    lognct = nct.bit_length() - 1 #floor(log2(nct))
 
     r = random_matrix(GF(2), 1, r_len)
     l = lognct - 10
@@ -172,8 +270,8 @@ def kobara_imai_gamma_encrypt(m, n, k, const, pk):
     c5_len = m_len + const_len + r_len - c4_len - k
     #c6_len = c1_len + c2_len - lognct - k
 
-    c1 = auxiliary.R(auxiliary.vector_to_bytes(r), c1_len) + auxiliary.concat_vectors(m, const)
-    c2 = r + auxiliary.R(auxiliary.vector_to_bytes(c1), r_len)
+    c1 = auxiliary.R(auxiliary.oracle_input([r], encoding), c1_len) + auxiliary.concat_vectors(m, const)
+    c2 = r + auxiliary.R(auxiliary.oracle_input([c1], encoding), r_len)
     c2c1 = auxiliary.concat_vectors(c2, c1)
     assert c2c1.ncols() == (c1.ncols() + c2.ncols())
     #print(c2c1.ncols(), c3_len, lognct)
@@ -193,16 +291,17 @@ def kobara_imai_gamma_encrypt(m, n, k, const, pk):
         return c
 
 #Encryption with the Kobara-Imai alpha protocol, implemented with the Barenghi-Pelosi conversion
-def kobara_imai_alpha_encrypt(m, n, k, pk):
+@instrument.timed
+def kobara_imai_alpha_encrypt(m, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
     t = pk[1]
     l, d = ideal_stc.fix_l_d(n, t)
     r_len = 160
     m_len = m.ncols()
     r = random_matrix(GF(2), 1, r_len)
-    out1 = auxiliary.H(auxiliary.concat_vectors_to_bytearray(r, m), n, t)
+    out1 = auxiliary.H(auxiliary.oracle_input([r, m], encoding), n, t)
     zbarbin = auxiliary.pad_as_bitstring(out1, l)
     zbar = zbarbin[:l]
-    zbar_bytes = auxiliary.bitstring_to_bytes(zbar)
+    zbar_bytes = auxiliary.oracle_input([zbar], encoding)
     y1y2 = auxiliary.R(zbar_bytes, r_len + m_len) + auxiliary.concat_vectors(r, m)
     y1 = auxiliary.MSB(y1y2, k)
     y2 = auxiliary.LSB(y1y2, r_len + m_len - k)
@@ -212,20 +311,49 @@ def kobara_imai_alpha_encrypt(m, n, k, pk):
     c2 = y2
     return c1, c2
 
+#Batch version of kobara_imai_alpha_encrypt, with the same conventions as fujisaki_okamoto_encrypt_sendrier_batch
+#Returns the b*n matrix C1 and the matrix C2 whose rows are the y2 parts of the ciphertexts
+@instrument.timed
+def kobara_imai_alpha_encrypt_batch(M, n, k, pk, encoding=auxiliary.LEGACY_ENCODING):
+    t = pk[1]
+    l, d = ideal_stc.fix_l_d(n, t)
+    r_len = 160
+    m_len = M.ncols()
+    b = M.nrows()
+    Rm = random_matrix(GF(2), b, r_len)
+    y1_rows = []
+    y2_rows = []
+    z_rows = []
+    for i in range(b):
+        r = Rm.submatrix(i, 0, 1, r_len)
+        m = M.submatrix(i, 0, 1, m_len)
+        out1 = auxiliary.H(auxiliary.oracle_input([r, m], encoding), n, t)
+        zbarbin = auxiliary.pad_as_bitstring(out1, l)
+        zbar = zbarbin[:l]
+        zbar_bytes = auxiliary.oracle_input([zbar], encoding)
+        y1y2 = auxiliary.R(zbar_bytes, r_len + m_len) + auxiliary.concat_vectors(r, m)
+        y1_rows.append(auxiliary.MSB(y1y2, k).list())
+        y2_rows.append(auxiliary.LSB(y1y2, r_len + m_len - k).list())
+        lv = ideal_stc.StC(zbar, d, n, t)
+        z_rows.append(auxiliary.positional_to_vector(lv, n).list())
+    C1 = classic.encrypt_batch(matrix(GF(2), b, k, y1_rows), matrix(GF(2), b, n, z_rows), pk)
+    C2 = matrix(GF(2), b, r_len + m_len - k, y2_rows)
+    return C1, C2
+
 #Decryption with the Kobara-Imai alpha protocol, implemented with the Barenghi-Pelosi conversion
-def kobara_imai_alpha_decrypt(c1, c2, pk, sk):
-    k = pk[0].nrows()
-    n = pk[0].ncols()
+@instrument.timed
+def kobara_imai_alpha_decrypt(c1, c2, pk, sk, ctx=None, encoding=auxiliary.LEGACY_ENCODING):
+    n, k = classic.public_key_dimensions(pk)
     t = pk[1]
     l, d = ideal_stc.fix_l_d(n, t)
     
-    y3, z = classic.decrypt(c1, sk, pk)
+    y3, z = classic.decrypt(c1, sk, pk, ctx)
     y2 = c2
     c_len = y3.ncols() + y2.ncols()
     lv = auxiliary.vector_to_positional(z)
     zbar = ideal_stc.CtS(lv, d, t, n, l)
-    rm = auxiliary.R(auxiliary.bitstring_to_bytes(zbar), c_len) + auxiliary.concat_vectors(y3, y2)
-    out1 = auxiliary.H(auxiliary.vector_to_bytes(rm), n, t)
+    rm = auxiliary.R(auxiliary.oracle_input([zbar], encoding), c_len) + auxiliary.concat_vectors(y3, y2)
+    out1 = auxiliary.H(auxiliary.oracle_input([auxiliary.MSB(rm, 160), auxiliary.LSB(rm, c_len - 160)], encoding), n, t) #the (r, m) split of rm
     expected_zbar = auxiliary.pad_as_bitstring(out1, l)[:l]
     if zbar == expected_zbar:
         m = auxiliary.LSB(rm, c_len - 160)
@@ -233,6 +361,46 @@ def kobara_imai_alpha_decrypt(c1, c2, pk, sk):
     else:
         return None
 
+#The decryption functions available to decrypt_batch, by scheme name
+#'classic' takes ciphertexts c and returns (m, e); the others take (c1, c2) pairs and return m or None
+DECRYPT_FUNCTIONS = {
+    'classic': classic.decrypt,
+    'fo_sendrier': fujisaki_okamoto_decrypt_sendrier,
+    'fo_ideal': fujisaki_okamoto_decrypt_ideal,
+    'alt_fo': alt_fujisaki_okamoto_decrypt,
+    'kobara_imai_alpha': kobara_imai_alpha_decrypt,
+}
+
+#Per-process state of the decrypt_batch workers, filled in once by init_decrypt_worker
+decrypt_worker_state = {}
+
+#Initializer of the decrypt_batch pool: runs once in each worker, so the key and its decryption context are not resent with every task
+def init_decrypt_worker(scheme, pk, sk, encoding=auxiliary.LEGACY_ENCODING):
+    decrypt_worker_state['scheme'] = scheme
+    decrypt_worker_state['encoding'] = encoding
+    decrypt_worker_state['pk'] = pk
+    decrypt_worker_state['sk'] = sk
+    decrypt_worker_state['ctx'] = classic.decryption_context(sk, pk)
+
+#Decrypts a single ciphertext with the key held by this worker
+def decrypt_worker(ciphertext):
+    scheme = decrypt_worker_state['scheme']
+    pk = decrypt_worker_state['pk']
+    sk = decrypt_worker_state['sk']
+    ctx = decrypt_worker_state['ctx']
+    if scheme == 'classic':
+        return classic.decrypt(ciphertext, sk, pk, ctx)
+    c1, c2 = ciphertext
+    return DECRYPT_FUNCTIONS[scheme](c1, c2, pk, sk, ctx, decrypt_worker_state['encoding'])
+
+#Decrypts a list of ciphertexts of one scheme (a key of DECRYPT_FUNCTIONS) over a pool of worker processes
+#Results come back in the order of the input; chunksize ciphertexts are sent to a worker at a time
+#processes defaults to the number of CPUs; encoding is the hash-input encoding of the ciphertexts
+def decrypt_batch(scheme, ciphertexts, pk, sk, processes=None, chunksize=1, encoding=auxiliary.LEGACY_ENCODING):
+    assert scheme in DECRYPT_FUNCTIONS
+    with multiprocessing.Pool(processes, initializer=init_decrypt_worker, initargs=(scheme, pk, sk, encoding)) as pool:
+        return pool.map(decrypt_worker, ciphertexts, chunksize)
+
 #The combinadics approach to creating a conversion function            
 def generate_all_error_vecs(n, t):
     limit = 1 << n
@@ -243,110 +411,3 @@ def generate_all_error_vecs(n, t):
         minbit=val&-val #rightmost 1 bit
         fillbit = (val+minbit)&~val  #rightmost 0 to the left of that bit
         val = val+minbit | (fillbit//(minbit<<1))-1
-
-#Timing of the Fujisaki-Okamoto protocol as implemented with the two different conversion functions        
-def time_original_f_o(n, t, m):
-    print("Testing the Fujisaki-Okamoto transform with n=", n, "t=", t, "m=", m)
-    pk, sk = classic.keygen(n, t, m)
-    print("Classic McEliece key generated...")
-    k = pk[0].nrows()
-    msg = random_matrix(GF(2), 1, k)
-    c1_sendrier, c2_sendrier = fujisaki_okamoto_encrypt_sendrier(msg, n, k, pk)
-    c1_ideal, c2_ideal = fujisaki_okamoto_encrypt_ideal(msg, n, k, pk)
-    
-    num_iter = 100
-    duration_sendrier_enc = 0
-    duration_sendrier_dec = 0
-    duration_ideal_enc = 0
-    duration_ideal_dec = 0
-    
-    for i in range(num_iter):
-        if i % (num_iter / 10) == 0:
-            print(i, "iterations...")
-        #Timing Sendrier
-        start_enc = timeit.default_timer()
-        c1, c2 = fujisaki_okamoto_encrypt_sendrier(msg, n, k, pk)
-        start_dec = timeit.default_timer()
-        d = fujisaki_okamoto_decrypt_sendrier(c1_sendrier, c2_sendrier, pk, sk)
-        stop_dec = timeit.default_timer()
-        assert d == msg
-        duration_sendrier_enc += (start_dec - start_enc)
-        duration_sendrier_dec += stop_dec - start_dec
-        
-        #Timing Barenghi-Pelosi
-        start_enc = timeit.default_timer()
-        c1, c2 = fujisaki_okamoto_encrypt_ideal(msg, n, k, pk)
-        start_dec = timeit.default_timer()
-        d = fujisaki_okamoto_decrypt_ideal(c1_ideal, c2_ideal, pk, sk)
-        stop_dec = timeit.default_timer()
-        assert d == msg
-        duration_ideal_enc += (start_dec - start_enc)
-        duration_ideal_dec += (stop_dec - start_dec)
-    print("Average encryption time of Fujisaki-Okamoto with Sendrier's conversion", duration_sendrier_enc / num_iter)
-    print("Average decryption time of Fujisaki-Okamoto with Sendrier's conversion", duration_sendrier_dec / num_iter)
-    print("Average encryption time of Fujisaki-Okamoto with Barenghi-Pelosi's conversion", duration_ideal_enc / num_iter)
-    print("Average decryption time of Fujisaki-Okamoto with Barenghi-Pelosi's conversion", duration_ideal_dec / num_iter)
-
-#Timing of the conversion-free Fujisaki-Okamoto transform    
-def time_alt_f_o(n, t, m):
-    print("Testing the Fujisaki-Okamoto transform (without Conversion) with n=", n, "t=", t, "m=", m)
-    pk, sk = classic.keygen(n, t, m)
-    print("Classic McEliece key generated...")
-    k = pk[0].nrows()
-    msg = random_matrix(GF(2), 1, k)
-    c1, c2 = alt_fujisaki_okamoto_encrypt(msg, n, k, pk)
-
-    num_iter = 100
-    duration_enc = 0
-    duration_dec = 0
-    
-    for i in range(num_iter):
-        if i % (num_iter / 10) == 0:
-            print(i, "iterations...")
-        start_enc = timeit.default_timer()
-        c1, c2 = alt_fujisaki_okamoto_encrypt(msg, n, k, pk)
-        start_dec = timeit.default_timer()
-        d = alt_fujisaki_okamoto_decrypt(c1, c2, pk, sk)
-        stop_dec = timeit.default_timer()
-        assert d == msg
-        duration_enc += start_dec - start_enc 
-        duration_dec += stop_dec - start_dec
-    print("Average encryption time of Fujisaki-Okamoto without Conversion", duration_enc / num_iter)
-    print("Average decryption time of Fujisaki-Okamoto without Conversion", duration_dec / num_iter)
-
-#Timing of the Kobara-Imai alpha protocol
-def time_kobara_imai(n, t, m):
-    print("Testing the Kobara-Imai alpha transform with n=", n, "t=", t, "m=", m)
-    pk, sk = classic.keygen(n, t, m)
-    k = pk[0].nrows()
-    msg = random_matrix(GF(2), 1, k)
-    const = random_matrix(GF(2), 1, 160)
-    c1, c2 = kobara_imai_alpha_encrypt(msg, n, k, pk)
-    
-    num_iter = 10000
-    duration_enc = 0
-    duration_dec = 0
-    
-    for i in range(num_iter):
-        if i % (num_iter / 10) == 0:
-            print(i, "iterations...")
-        start_enc = timeit.default_timer()
-        c1, c2 = kobara_imai_alpha_encrypt(msg, n, k, pk)
-        start_dec = timeit.default_timer()
-        d = kobara_imai_alpha_decrypt(c1, c2, pk, sk)
-        stop_dec = timeit.default_timer()
-        assert d == msg
-        duration_enc += start_dec - start_enc
-        duration_dec += stop_dec - start_dec
-    print("Average encryption time of Kobara-Imai alpha", duration_enc / num_iter)
-    print("Average decryption time of Kobara-Imai alpha", duration_dec / num_iter)
-
-#time_alt_f_o(1024, 38, 10)
-#time_alt_f_o(2048, 69, 11)
-#time_alt_f_o(4096, 128, 12)
-#time_original_f_o(1024, 38, 10)
-#time_original_f_o(2048, 69, 11)
-#time_original_f_o(4096, 128, 12)
-#time_kobara_imai(1024, 38, 10)
-#time_kobara_imai(2048, 69, 11)
-#time_kobara_imai(4096, 128, 12)
\ No newline at end of file
@@ -7,54 +7,212 @@ References:
  - D. Engelbert, R. Overbeck, and A. Schmidt. A Summary of McEliece-Type Cryptosystems and their Security. Cryptology ePrint Archive, Paper 2006/162. https://eprint.iacr.org/2006/162. 2006. url: https://eprint.iacr.org/2006/162.
 
 Functions:
- - generate_P: Generate the permutation matrix P 
- - generate_S: Generate the matrix S
+ - generate_P: Generate the permutation P as an index array
+ - invert_permutation: Invert a permutation index array in O(n)
+ - permute: Apply a permutation index array to the columns of a matrix (computes vP in O(n) per row)
+ - permutation_from_matrix: Convert a dense permutation matrix (older secret keys) to an index array
+ - random_lower_triangular: Generate a random unit lower triangular matrix together with its inverse
+ - generate_S: Generate the matrix S together with S^{-1}
+ - random_squarefree_goppa: Draw a random square-free Goppa polynomial g and a support L on which g has no roots
+ - random_irreducible: Draw a random irreducible polynomial of degree t over GF(2^m) as the minimal polynomial of a random element of GF(2^(mt))
+ - parity_check_matrix: Build the binary mt*n parity-check matrix of the Goppa code of g and L with the gf2m engine
+ - packed_rref: Reduce a bit-packed binary matrix to reduced row echelon form with NumPy row XORs
+ - generate_G_parity_check: Generate a Goppa code generator matrix G as the nullspace of the parity-check matrix (fast, default in keygen)
  - generate_G_squarefree: Generate a Goppa code generator matrix G using a square-free polynomial 
  - generate_G_irreducible: Try to generate a Goppa code generator matrix G using an irreducible polynomial (abandoned due to difficulties in efficiently generating irrediucible polynomials)
- - keygen: Generate the public key (SGP, t) and the private key (S, P, decoding_info) from the parameters n, t, m (k is decided by Goppa creation)
+ - keygen: Generate the public key (SGP, t) and the private key (S, P, decoding_info, S^{-1}) from the parameters n, t, m (k is decided by Goppa creation)
+ - is_systematic: Check whether a public key is stored in systematic form (T, t, SYSTEMATIC)
+ - public_key_dimensions: The code length n and dimension k behind a dense or systematic public key
  - encrypt: Classic McEliece encryption 
+ - encrypt_batch: Classic McEliece encryption of the rows of a b*k message matrix with one matrix product
+ - decryption_context: Precompute the key-dependent parts of decryption (P^{-1}, SG, decoding info) once
  - decrypt: Classic McEliece error-correction and decoding 
 
+encrypt, decrypt and the stages of decrypt (permute, decode, unpermute, solve) are timed in instrument.py spans.
+
 '''
 
 from sage.all_cmdline import *   # import sage library
 import bernstein
-import timeit
+import syndrome
+import gf2m
+import instrument
+import numpy as np
 
 _sage_const_2 = Integer(2); _sage_const_1 = Integer(1); _sage_const_38 = Integer(38); _sage_const_6 = Integer(6); _sage_const_5 = Integer(5); _sage_const_69 = Integer(69); _sage_const_128 = Integer(128); _sage_const_7 = Integer(7); _sage_const_0 = Integer(0); _sage_const_1024 = Integer(1024); _sage_const_10 = Integer(10); _sage_const_2048 = Integer(2048); _sage_const_11 = Integer(11); _sage_const_4096 = Integer(4096); _sage_const_12 = Integer(12)
 
-#Return an n*n permutation of an identity matrix
+#Marker stored as the third entry of a public key published in systematic form
+SYSTEMATIC = 'systematic'
+
+#Goppa decoders available to decrypt: Bernstein's interpolation decoder (bernstein.py) or syndrome decoding with Berlekamp-Massey (syndrome.py)
+DECODERS = ('interpolation', 'syndrome')
+
+#Ways for keygen to build the Goppa code: the packed parity-check elimination with an irreducible g (generate_G_parity_check),
+#the same with a square-free g, or sagemath's GoppaCode with a square-free g (generate_G_squarefree)
+KEYGEN_METHODS = ('parity_check', 'parity_check_squarefree', 'squarefree')
+
+#Return a random permutation P of n positions as an index array perm
+#perm[j] = i means P[i, j] = 1, i.e. column j of vP is column i of v
 def generate_P(n):
+    perm = list(range(n))
+    shuffle(perm)
+    return perm
+
+#Return the index array of P^{-1} given the index array of P
+def invert_permutation(perm):
+    inv = [0] * len(perm)
+    for j in range(len(perm)):
+        inv[perm[j]] = j
+    return inv
+
+#Return M * P for a matrix M (usually a row vector) and a permutation index array perm, by gathering columns
+def permute(M, perm):
+    return M.matrix_from_columns(perm)
+
+#Return the index array of a dense n*n permutation matrix, so secret keys with a matrix P can still be used
+def permutation_from_matrix(P):
+    return [P.nonzero_positions_in_column(j)[0] for j in range(P.ncols())]
+
+#Return a random binary k*k unit lower triangular matrix L and its inverse
+#L = [[L1, 0], [B, L2]] is built recursively, and then L^{-1} = [[L1^{-1}, 0], [L2^{-1} B L1^{-1}, L2^{-1}]] over GF(2)
+def random_lower_triangular(k):
     R = GF(2)
-    M = identity_matrix(R, n)
-    perm = Permutations(n).random_element()
-    for i in range(n):
-        j = perm[i] - 1
-        M.swap_rows(i, j)
-    return M
-
-#Return a random binary non-singular matrix
+    if k <= 64:
+        L = identity_matrix(R, k)
+        for i in range(k):
+            for j in range(i):
+                L[i, j] = randrange(2)
+        return L, L.inverse()
+    h = k // 2
+    L1, L1inv = random_lower_triangular(h)
+    L2, L2inv = random_lower_triangular(k - h)
+    B = random_matrix(R, k - h, h)
+    Z = zero_matrix(R, h, k - h)
+    L = block_matrix(R, [[L1, Z], [B, L2]], subdivide=False)
+    Linv = block_matrix(R, [[L1inv, Z], [L2inv * B * L1inv, L2inv]], subdivide=False)
+    return L, Linv
+
+#Return a random binary non-singular matrix S and its inverse
+#S = QLU for random unit triangular L, U and a random row permutation Q, so it is invertible by construction and needs no rank test
 def generate_S(k):
-    R = GF(2)
-    M = random_matrix(R, k, k)
-    while M.is_singular():
-        M = random_matrix(R, k, k)
-    return M
+    L, Linv = random_lower_triangular(k)
+    U, Uinv = random_lower_triangular(k)
+    U = U.transpose()
+    Uinv = Uinv.transpose()
+    q = generate_P(k)
+    S = (L * U).matrix_from_rows(q)
+    S_inv = (Uinv * Linv).matrix_from_columns(q) #(QLU)^{-1} = U^{-1} L^{-1} Q^T
+    return S, S_inv
+
+#Return a random monic square-free polynomial g of degree t over F = GF(2^m) and a support L of n distinct elements of F with g(L[i]) != 0
+#Candidates are drawn batch at a time on the gf2m engine: square-freeness is gcd(g, g') = 1, screened with one batched gcd,
+#and the roots test evaluates every square-free candidate on a freshly shuffled support at once
+#(this batched Horner evaluation replaces the additive FFT screen: one NumPy pass over a whole batch is faster than one FFT per candidate,
+#e.g. 0.046 s against 0.12 s for 16 candidates at n, t, m = 4096, 128, 12 even with the FFT on integer tables rather than sagemath elements)
+def random_squarefree_goppa(n, t, F, batch=16):
+    tables = gf2m.field_tables(F)
+    q = tables['q']
+    idx = list(range(q))
+    while True:
+        shuffle(idx)
+        alpha = np.array(idx[:n], dtype=np.int64)
+        G = np.array([[randrange(q) for j in range(t)] + [1] for i in range(batch)], dtype=np.int64)
+        #in characteristic 2 the derivative keeps the odd-degree coefficients, one degree down
+        D = np.zeros((batch, t), dtype=np.int64)
+        D[:, 0::2] = G[:, 1::2]
+        squarefree = np.nonzero(gf2m.batch_gcd_degree(tables, G, D) == 0)[0]
+        if len(squarefree) == 0:
+            continue
+        noroots = np.all(gf2m.batch_poly_eval(tables, G[squarefree], alpha) != 0, axis=1)
+        if noroots.any():
+            g = F['x'](gf2m.to_field(tables, G[squarefree[np.argmax(noroots)]]))
+            L = gf2m.to_field(tables, alpha)
+            return g, L
+
+#Return a random monic irreducible polynomial of degree t over F
+#It is the minimal polynomial over F of a random element of F[x]/(h) = GF(2^(mt)) for a fixed irreducible h of degree t;
+#the element generates GF(2^(mt)) over F (so its minimal polynomial has degree t) with high probability, otherwise we redraw
+def random_irreducible(F, t):
+    Fpoly = F['x']
+    Q = Fpoly.quotient(Fpoly.irreducible_element(t))
+    while True:
+        g = Fpoly(Q.random_element().minpoly().list())
+        if g.degree() == t:
+            return g
+
+#Return the binary mt*n parity-check matrix of the Goppa code of g and L as a NumPy uint8 array of bits
+#Row m*j + b holds bit b of L[i]^j / g(L[i]) in column i, so c is a codeword iff the sum of c_i L[i]^j / g(L[i]) is 0 for j < t
+def parity_check_matrix(g, L, F):
+    tables = gf2m.field_tables(F)
+    m = tables['m']
+    t = g.degree()
+    alpha = gf2m.to_ints(tables, L)
+    g_alpha = gf2m.poly_eval(tables, gf2m.to_ints(tables, g.list()), alpha)
+    assert np.all(g_alpha != 0), 'g has a root in the support'
+    w = gf2m.inv(tables, g_alpha)
+    H = np.zeros((m * t, len(L)), dtype=np.uint8)
+    for j in range(t):
+        for b in range(m):
+            H[m * j + b] = (w >> b) & 1
+        w = gf2m.mul(tables, w, alpha)
+    return H
+
+#Takes as input a binary matrix as a NumPy array of bits (one row per row)
+#Returns (R, pivots): the reduced row echelon form of the matrix as an array of bits without its zero rows, and its pivot columns
+#Rows are packed into 64-bit words so each elimination step XORs whole rows at once
+def packed_rref(M):
+    nrows, ncols = M.shape
+    nbytes = ((ncols + 63) // 64) * 8
+    rows8 = np.zeros((nrows, nbytes), dtype=np.uint8)
+    rows8[:, :(ncols + 7) // 8] = np.packbits(M, axis=1)
+    rows64 = rows8.view(np.uint64)
+    pivots = []
+    r = 0
+    for c in range(ncols):
+        if r == nrows:
+            break
+        byte = c >> 3
+        mask = 0x80 >> (c & 7)
+        hits = np.nonzero(rows8[r:, byte] & mask)[0]
+        if len(hits) == 0:
+            continue
+        p = r + hits[0]
+        if p != r:
+            rows64[[r, p]] = rows64[[p, r]]
+        others = np.nonzero(rows8[:, byte] & mask)[0]
+        others = others[others != r]
+        rows64[others] ^= rows64[r]
+        pivots.append(c)
+        r = r + 1
+    return np.unpackbits(rows8[:r], axis=1)[:, :ncols], pivots
+
+#Return the generator matrix of a Goppa code as the nullspace of its parity-check matrix, computed with packed_rref
+#g is irreducible (so it has no roots in F and any n distinct elements form a support) unless irreducible=False, when it is drawn as in generate_G_squarefree
+def generate_G_parity_check(n, t, m, irreducible=True):
+    F = GF(2**m)
+    if irreducible:
+        assert t >= 2 #an irreducible g of degree 1 has a root in GF(2^m), which L may contain
+        g = random_irreducible(F, t)
+        L = list(F)
+        shuffle(L)
+        L = L[:n]
+    else:
+        g, L = random_squarefree_goppa(n, t, F)
+    R, pivots = packed_rref(parity_check_matrix(g, L, F))
+    #With R in reduced row echelon form, the nullspace has one basis vector per free column f: 1 at f and R[:, f] at the pivot columns
+    free = sorted(set(range(n)) - set(pivots))
+    k = len(free)
+    bits = np.zeros((k, n), dtype=np.uint8)
+    bits[np.arange(k), free] = 1
+    bits[:, pivots] = R[:, free].T
+    G = matrix(GF(2), k, n, bits.ravel().tolist())
+    return (k, G, g, L, F)
 
 #Return the generator matrix of a Goppa code using a square-free polynomial 
 def generate_G_squarefree(n, t, m):
     q = 2**m 
     F = GF(q)
-    Fpoly = F['x']
-    (x,) = Fpoly._first_ngens(1)
-    a = list(F)
-    while True:
-        shuffle(a)
-        L = a[:n]
-        g = Fpoly([F.random_element() for j in range(t)] + [1])
-        if g.is_squarefree():
-            if all(g(aj) != 0 for aj in L):
-                break
+    g, L = random_squarefree_goppa(n, t, F)
     C = codes.GoppaCode(g, L)
     G = C.generator_matrix()
     k = G.nrows()
@@ -95,52 +253,149 @@ def generate_G_irreducible(n, t, m):
     return (k, G, g, L, Fpm)
     
 #Return a public key and private key for Classic McEliece
-def keygen(n, t, m):
-    goppa_info = generate_G_squarefree(n, t, m)
+#With systematic=True the public key is (T, t, SYSTEMATIC), where SGP = [I_k | T], so only the k*(n-k) redundant part is published
+#method is one of KEYGEN_METHODS
+def keygen(n, t, m, systematic=False, method='parity_check'):
+    assert method in KEYGEN_METHODS
+    if method == 'squarefree':
+        goppa_info = generate_G_squarefree(n, t, m)
+    else:
+        goppa_info = generate_G_parity_check(n, t, m, method == 'parity_check')
     k = goppa_info[0]
     G1 = goppa_info[1]
     decoding_info = (goppa_info[2], goppa_info[3], goppa_info[4])
-    P = generate_P(n)
-    S = generate_S(k)
     
-    G = S * G1 * P
-    pk = (G, t)
-    sk = (S, P, decoding_info)
+    if systematic:
+        #S is forced to be the inverse of the first k columns of G1*P, so we redraw P until those columns are independent
+        while True:
+            P = generate_P(n)
+            G1P = permute(G1, P)
+            left = G1P.matrix_from_columns(list(range(k)))
+            if not left.is_singular():
+                break
+        S = left.inverse()
+        S_inv = left
+        T = (S * G1P).matrix_from_columns(list(range(k, n)))
+        pk = (T, t, SYSTEMATIC)
+    else:
+        P = generate_P(n)
+        S, S_inv = generate_S(k)
+        G = S * permute(G1, P)
+        pk = (G, t)
+    sk = (S, P, decoding_info, S_inv)
     return pk, sk
 
+#Return True if the public key only stores the redundant part T of a systematic generator [I_k | T]
+def is_systematic(pk):
+    return len(pk) > 2 and pk[2] == SYSTEMATIC
+
+#Return the code length n and dimension k of a public key in either form
+def public_key_dimensions(pk):
+    if is_systematic(pk):
+        T = pk[0]
+        return T.nrows() + T.ncols(), T.nrows()
+    G = pk[0]
+    return G.ncols(), G.nrows()
+
 #Encrypt for Classic McEliece    
+@instrument.timed
 def encrypt(m, z, pk):
-    G = pk[0]
-    c = (m * G) + z
+    if is_systematic(pk):
+        T = pk[0]
+        c = m.augment(m * T) + z #(m | mT) + z
+    else:
+        G = pk[0]
+        c = (m * G) + z
     return c
+
+#Encrypt every row of a b*k message matrix M with the matching row of a b*n error matrix Z
+#This is one b*k by k*n product, which M4RI does much faster than b separate row-vector products
+def encrypt_batch(M, Z, pk):
+    n, k = public_key_dimensions(pk)
+    assert M.ncols() == k and Z.ncols() == n and M.nrows() == Z.nrows()
+    return encrypt(M, Z, pk)
     
-#Decrypt (error-correct and decode) for Classic McEliece    
-def decrypt(c, sk, pk):
-    # c = mSGP + e 
-    # do cP^{-1} = mSG + eP^{-1}
-    # do Bernstein error correcting to remove eP^{-1} (P is a permutation matrix, so this term is also a vector of weight t)
-    # now do SG.solve_left(cP^{-1}) to get m
+#Return the decryption context (P, P^{-1}, SG, decoding_info, J, W, decoder, decoder_data) for a key pair, with P and P^{-1} as index arrays
+#J is an information set of the Goppa code and W = G[J]^{-1} S^{-1}, so that m = (mSG)[J] * W
+#decoder is one of DECODERS; decoder_data is the per-key decoder from bernstein.goppa_decoder for 'interpolation'
+#and the parity-check matrix from syndrome.parity_check for 'syndrome'
+#Everything in it depends only on the key, so it can be built once and passed to every decrypt call
+#SG, J and W are None for a systematic public key since decryption does not need them
+def decryption_context(sk, pk, decoder='interpolation'):
+    assert decoder in DECODERS
     S = sk[0]
     P = sk[1]
+    if not isinstance(P, list):
+        P = permutation_from_matrix(P)
     decoding_info = sk[2]
-    SGP = pk[0] # this is SG'P where G is the generator matrix
-    n = SGP.ncols()
-    k = SGP.nrows()
+    P1 = invert_permutation(P)
+    if is_systematic(pk):
+        SG = None
+        J = None
+        W = None
+    else:
+        if len(sk) > 3:
+            S_inv = sk[3]
+        else:
+            S_inv = S.inverse() #older secret keys do not store S^{-1}
+        SGP = pk[0] # this is SG'P where G is the generator matrix
+        SG = permute(SGP, P1)
+        G = S_inv * SG
+        J = list(G.pivots())
+        W = G.matrix_from_columns(J).inverse() * S_inv
+    g = decoding_info[0]
+    alpha = decoding_info[1]
+    F = decoding_info[2]
+    n, k = public_key_dimensions(pk)
+    t = pk[1]
+    if decoder == 'syndrome':
+        decoder_data = syndrome.parity_check(n, t, F, alpha, g)
+    else:
+        decoder_data = bernstein.goppa_decoder(n, t, F, alpha, g)
+    return (P, P1, SG, decoding_info, J, W, decoder, decoder_data)
+
+#Decrypt (error-correct and decode) for Classic McEliece    
+#ctx is the output of decryption_context(sk, pk, decoder); it is built on the fly with the given decoder if not given
+@instrument.timed
+def decrypt(c, sk, pk, ctx=None, decoder='interpolation'):
+    # c = mSGP + e 
+    # do cP^{-1} = mSG + eP^{-1}
+    # do Bernstein error correcting (or syndrome decoding) to remove eP^{-1} (P is a permutation matrix, so this term is also a vector of weight t)
+    # now mS is read off the information set J of G, and m = (mS)S^{-1}; both steps are the single product with W
+    # with a systematic public key SGP = [I_k | T], so m is simply the first k bits of c + e
+    if ctx is None:
+        ctx = decryption_context(sk, pk, decoder)
+    P = ctx[0]
+    P1 = ctx[1]
+    decoding_info = ctx[3]
+    J = ctx[4]
+    W = ctx[5]
+    decoder = ctx[6]
+    decoder_data = ctx[7]
+    n, k = public_key_dimensions(pk)
     t = pk[1]
     g = decoding_info[0]
     alpha = decoding_info[1]
     F = decoding_info[2]
     
-    P1 = P.inverse()
-    SG = SGP * P1
-    c = c * P1 #now we have c = mSG + eP^{-1}
+    with instrument.span('classic.decrypt.permute'):
+        cP1 = permute(c, P1) #now we have cP1 = mSG + eP^{-1}
     
-    e_list = bernstein.goppa_errors(n, t, F, alpha, g, c[0])
-    eP = matrix(GF(2), 1, n, [e_list]) #Remember that we multiplied with P^{-1} so the error that we corrected is not the original error e 
-    e = eP * P
+    with instrument.span('classic.decrypt.decode'):
+        if decoder == 'syndrome':
+            e_list = syndrome.syndrome_errors(n, t, F, alpha, g, cP1[0], decoder_data)
+        else:
+            e_list = bernstein.goppa_decode(decoder_data, cP1[0])
+    with instrument.span('classic.decrypt.unpermute'):
+        eP = matrix(GF(2), 1, n, [e_list]) #Remember that we multiplied with P^{-1} so the error that we corrected is not the original error e 
+        e = permute(eP, P)
     
-    c = c + eP #now we have c = mSG = (mS)(G)
-    m = SG.solve_left(c)
+    with instrument.span('classic.decrypt.solve'):
+        if is_systematic(pk):
+            m = (c + e).matrix_from_columns(list(range(k)))
+        else:
+            cP1 = cP1 + eP #now we have cP1 = mSG = (mS)(G)
+            m = cP1.matrix_from_columns(J) * W
     
     return m, e
 
@@ -155,70 +410,3 @@ def select_error(z, t, n):
         elif wt > t:
             z[0, pos_to_change] = 0
         wt = vector(z).hamming_weight()
-
-#Runtime for keygen    
-def test_keygen(n, t, m):
-    num_iter = 10000
-    duration = 0
-    for i in range(num_iter):
-        start = timeit.default_timer()
-        pk, sk = keygen(n, t, m)
-        stop = timeit.default_timer()
-        duration += stop - start
-    print("Average time for McEliece key generation is", duration / num_iter)
-
-#Runtime for encrypt    
-def test_encrypt(n, t, m):
-    pk, sk = keygen(n, t, m)
-    print("Keygen done.")
-    k = pk[0].nrows()
-    msg = random_matrix(GF(2), 1, k)
-    
-    num_iter = 10000
-    duration = 0
-    for i in range(num_iter):
-        if (i % (num_iter / 10)) == 0:
-            print(i, "iterations...")
-        start = timeit.default_timer()
-        z = random_matrix(GF(2), 1, n)
-        select_error(z, t, n)
-        c = encrypt(msg, z, pk)
-        stop = timeit.default_timer()
-        duration = duration + stop - start
-    print("Average encryption time of classic McEliece (including error vector generation) is", duration / num_iter)
-
-#Runtime and test for decrypt    
-def test_decrypt(n, t, m):
-    print("Timing Classic McEliece for n=", n, "t=", t, "m=", m)
-    pk, sk = keygen(n, t, m)
-    print("Keygen done")
-    k = pk[0].nrows()
-    num_iter = 100
-    duration_enc = 0
-    duration_dec = 0
-    z = matrix(GF(2), 1, n)
-    select_error(z, t, n)
-    c = encrypt(msg, z, pk)
-    
-    for i in range(num_iter):
-        if (i % (num_iter / 10)) == 0:
-            print(i, "iterations...")
-        
-        msg = random_matrix(GF(2), 1, k)
-        start_enc = timeit.default_timer()
-        z = matrix(GF(2), 1, n)
-        select_error(z, t, n)
-        
-        c = encrypt(msg, z, pk)
-        start_dec = timeit.default_timer()
-        d, e = decrypt(c, sk, pk)
-        assert d == msg
-        stop_dec = timeit.default_timer()
-        duration_enc += start_dec - start_enc 
-        duration_dec += stop_dec - start_dec
-    print("Average encryption time of classic McEliece (including error vector generation) is", duration_enc / num_iter)
-    print("Average decryption time of classic McEliece is", duration_dec / num_iter)
-    
-#test_decrypt(1024, 38, 10)
-#test_decrypt(2048, 69, 11)
-#test_decrypt(4096, 128, 12)
\ No newline at end of file
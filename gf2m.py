@@ -0,0 +1,182 @@
+'''
+Author: Nishka Dasgupta
+
+A table-driven engine for arithmetic in GF(2^m) (m <= 16, aimed at m <= 13), used on the decoder and key generation hot paths instead of sagemath field elements.
+Elements are small integers whose bits are the coordinates in the polynomial basis 1, z, ..., z^(m-1) of the sagemath field, so the engine gives exactly
+the same results as sagemath; conversion happens only at the API boundary. Log/antilog tables are built once per field.
+Addition is XOR; multiplication and inversion go through the tables and work elementwise on NumPy arrays.
+Polynomials are NumPy arrays of coefficients, lowest degree first; a batch of polynomials is a 2D array with one polynomial per row.
+
+Functions:
+ - field_tables: Build (once per field, cached) the log/antilog tables and the conversions to and from sagemath
+ - to_ints: Convert sagemath field elements to engine integers
+ - to_field: Convert engine integers back to sagemath field elements
+ - mul: Elementwise product of arrays (or ints)
+ - inv: Elementwise inverse of an array (or int) of nonzero elements
+ - square: Elementwise square
+ - poly_eval: Evaluate a polynomial at an array of points (vectorised Horner)
+ - batch_poly_eval: Evaluate a batch of polynomials at an array of points at once
+ - degrees: The degree of each polynomial in a batch
+ - batch_gcd_degree: The degree of the gcd of each pair of polynomials in two batches (Euclid run on all pairs at once)
+ - test_field_tables: Test the engine against sagemath arithmetic
+'''
+
+from sage.all_cmdline import *   # import sage library
+import numpy as np
+import additive_fft
+
+#Tables already built, by field
+tables_cache = {}
+
+#Takes as input a field GF(2^m)
+#Returns a dict with the field, m, q = 2^m, the exp and log tables (as NumPy arrays and as lists for scalar use),
+#the sagemath element of each integer (elements) and the integer of each sagemath element (index)
+#exp has zeros past 2(q-1) and log[0] = 2(q-1), so exp[log[a] + log[b]] is the product a*b even when a or b is 0
+def field_tables(k):
+    if k in tables_cache:
+        return tables_cache[k]
+    m = k.degree()
+    q = 2**m
+    assert k.characteristic() == 2 and m <= 16
+    elements = additive_fft.field_span(additive_fft.field_basis(k))
+    index = {}
+    for i in range(q):
+        index[elements[i]] = i
+    modulus = sum(int(c) << i for i, c in enumerate(k.modulus().list()))
+
+    #Find a generator of the multiplicative group with shift-and-add multiplication, then tabulate its powers
+    def mulmod(a, b):
+        res = 0
+        while b:
+            if b & 1:
+                res = res ^ a
+            b = b >> 1
+            a = a << 1
+            if a & q:
+                a = a ^ modulus
+        return res
+
+    for gen in range(1, q):
+        powers = [1]
+        x = gen
+        while x != 1:
+            powers.append(x)
+            x = mulmod(x, gen)
+        if len(powers) == q - 1:
+            break
+    exp = powers + powers + [0] * (2 * (q - 1) + 1)
+    log = [2 * (q - 1)] * q
+    for i in range(q - 1):
+        log[powers[i]] = i
+    tables = {'field': k, 'm': m, 'q': q, 'exp': np.array(exp, dtype=np.int64), 'log': np.array(log, dtype=np.int64),
+              'exp_list': exp, 'log_list': log, 'elements': elements, 'index': index}
+    tables_cache[k] = tables
+    return tables
+
+#Takes as input the tables and a list of elements of the field (or of GF(2))
+#Returns the corresponding NumPy array of integers
+def to_ints(tables, xs):
+    k = tables['field']
+    index = tables['index']
+    return np.array([index[k(x)] for x in xs], dtype=np.int64)
+
+#Takes as input the tables and an iterable of integers
+#Returns the list of corresponding sagemath field elements
+def to_field(tables, xs):
+    elements = tables['elements']
+    return [elements[int(x)] for x in xs]
+
+#Returns the elementwise product of a and b (NumPy arrays or ints)
+def mul(tables, a, b):
+    log = tables['log']
+    return tables['exp'][log[a] + log[b]]
+
+#Returns the elementwise inverse of a (NumPy array or int) whose entries are nonzero
+#(log[0] is a placeholder, so a zero entry would silently give a nonzero result)
+def inv(tables, a):
+    assert np.all(a != 0), 'inverse of zero in GF(2^m)'
+    return tables['exp'][(tables['q'] - 1) - tables['log'][a]]
+
+#Returns the elementwise square of a
+def square(tables, a):
+    return tables['exp'][2 * tables['log'][a]]
+
+#Takes as input a polynomial as an array of coefficients (lowest degree first) and an array of points
+#Returns the array of values of the polynomial at the points
+def poly_eval(tables, coeffs, points):
+    points = np.asarray(points, dtype=np.int64)
+    res = np.zeros(points.shape, dtype=np.int64)
+    for c in reversed(list(coeffs)):
+        res = mul(tables, res, points) ^ int(c)
+    return res
+
+#Takes as input a batch of polynomials (a b*(d+1) array, one per row) and an array of points
+#Returns the b*len(points) array of the values of each polynomial at each point
+def batch_poly_eval(tables, coeffs, points):
+    coeffs = np.asarray(coeffs, dtype=np.int64)
+    points = np.asarray(points, dtype=np.int64)[None, :]
+    res = np.zeros((coeffs.shape[0], points.shape[1]), dtype=np.int64)
+    for j in range(coeffs.shape[1] - 1, -1, -1):
+        res = mul(tables, res, points) ^ coeffs[:, j:j + 1]
+    return res
+
+#Takes as input a batch of polynomials
+#Returns the array of their degrees (-1 for the zero polynomial)
+def degrees(coeffs):
+    nonzero = coeffs != 0
+    return np.where(nonzero.any(axis=1), coeffs.shape[1] - 1 - np.argmax(nonzero[:, ::-1], axis=1), -1)
+
+#Takes as input two batches of polynomials a and b with the same number of rows
+#Returns the array of the degrees of gcd(a[i], b[i]) (-1 if both are zero)
+#Each round does one step of Euclid's algorithm on every pair that is not finished: swap so that deg a >= deg b,
+#then cancel the leading term of a with a multiple of b, so a pair needs at most deg a + deg b rounds
+def batch_gcd_degree(tables, a, b):
+    width = max(a.shape[1], b.shape[1])
+    A = np.zeros((a.shape[0], width), dtype=np.int64)
+    B = np.zeros((a.shape[0], width), dtype=np.int64)
+    A[:, :a.shape[1]] = a
+    B[:, :b.shape[1]] = b
+    rows = np.arange(A.shape[0])
+    cols = np.arange(width)[None, :]
+    while True:
+        da = degrees(A)
+        db = degrees(B)
+        active = db >= 0
+        if not active.any():
+            return da
+        swap = active & (da < db)
+        A[swap], B[swap] = B[swap], A[swap].copy()
+        da, db = np.where(swap, db, da), np.where(swap, da, db)
+        act = rows[active]
+        shift = (da - db)[act][:, None]
+        #B[i] * x^shift[i], by gathering column j - shift of B
+        shifted = np.where(cols >= shift, np.take_along_axis(B[act], np.maximum(cols - shift, 0), axis=1), 0)
+        coef = mul(tables, A[act, da[act]], inv(tables, B[act, db[act]]))
+        A[act] = A[act] ^ mul(tables, shifted, coef[:, None])
+
+def test_field_tables():
+    for m in range(1, 14):
+        k = GF(2**m)
+        tables = field_tables(k)
+        for loop in range(100):
+            a = k.random_element()
+            b = k.random_element()
+            ia, ib = to_ints(tables, [a, b])
+            assert to_field(tables, [ia ^ ib])[0] == a + b
+            assert to_field(tables, [mul(tables, ia, ib)])[0] == a * b
+            assert to_field(tables, [square(tables, ia)])[0] == a**2
+            if a != 0:
+                assert to_field(tables, [inv(tables, ia)])[0] == 1 / a
+        f = k['x'].random_element(randrange(20))
+        xs = list(k)
+        assert to_field(tables, poly_eval(tables, to_ints(tables, f.list()), to_ints(tables, xs))) == [f(x) for x in xs]
+        fs = [k['x'].random_element(randrange(1, 20)) for j in range(5)]
+        hs = [k['x'].random_element(randrange(1, 20)) for j in range(5)]
+        width = 1 + max(f.degree() for f in fs + hs)
+        A = np.array([to_ints(tables, f.list() + [0] * (width - len(f.list()))) for f in fs])
+        B = np.array([to_ints(tables, h.list() + [0] * (width - len(h.list()))) for h in hs])
+        values = batch_poly_eval(tables, A, to_ints(tables, xs))
+        assert [to_field(tables, row) for row in values] == [[f(x) for x in xs] for f in fs]
+        assert list(batch_gcd_degree(tables, A, B)) == [gcd(f, h).degree() for f, h in zip(fs, hs)]
+
+#test_field_tables()
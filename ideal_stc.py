@@ -13,14 +13,21 @@ Functions:
  - ctrand: Returns a random value 
  - fix_l_d: Chooses appropriate l, d for the protocol
  - StC: string-to-constant-weight-vector function
+ - StC_finish: The final step of StC (completing the last lambda and drawing the rest at random), shared with StC_batch
+ - StC_batch: StC on many strings of the same length at once, one NumPy step per bit position
  - CtS: constant-weight-vector-to-string function 
  - test: Test invertibility
+ - test_batch: Test that StC_batch gives the same vectors as StC called on each string in turn
+
+StC, StC_batch and CtS are timed in instrument.py spans.
 '''
 
 from sage.all_cmdline import *
 from math import ceil, log2
 from random import randrange
+import numpy as np
 import auxiliary
+import instrument
 
 #Takes as input a boolean cond, and two values t and f 
 #Returns t if cond is true, f otherwise
@@ -58,9 +65,13 @@ def fix_l_d(n, t):
     assert (l * d) <= (n - t)
     return l, d
 
-#Converts a binary string B to a vector of weight t (represented as run-length encodings)   
+#Converts a binary string B (a bitstring or an auxiliary.BitVector) to a vector of weight t (represented as run-length encodings)   
+#The bits are taken from an integer buffer, most significant first
+@instrument.timed
 def StC(B, d, n, t):
-    l = len(B)
+    B = auxiliary.to_bitvector(B)
+    l = B.length
+    value = B.value
     lambdaVec = [0] * t
     
     qdone = 0
@@ -74,14 +85,14 @@ def StC(B, d, n, t):
     idx = 0
     rbitctr = 0
     remainingpos = n - t
+    rlimit = int(log2(d)) + 1
     
-    for ind in range(len(B)):
-        ch = B[ind]
-        b = int(ch)
+    for ind in range(l):
+        b = (value >> (l - 1 - ind)) & 1
         qdone = qdone | (1 - b)
         q = q + (b & (1 - qdone))
         rbitctr = rbitctr + qdone 
-        rdone = (rbitctr == (int(log2(d)) + 1))
+        rdone = (rbitctr == rlimit)
         r = 2 * r + (b & qdone)
         lam = q * d + r 
         ctstore(lambdaVec, idx, lam)
@@ -93,7 +104,11 @@ def StC(B, d, n, t):
         r = ctcond(lambdadone, 0, r)
         rbitctr = ctcond(lambdadone, 0, rbitctr)
     
-    #Now bar(lambda)
+    return StC_finish(lambdaVec, d, t, qdone, rdone, lambdadone, q, r, lam, idx, rbitctr, remainingpos)
+
+#Takes as input the vector and the state of StC after all the bits of B are read
+#Returns the finished vector: the lambda in progress is completed at random (bar(lambda)) and the remaining ones are drawn at random
+def StC_finish(lambdaVec, d, t, qdone, rdone, lambdadone, q, r, lam, idx, rbitctr, remainingpos):
     casepq = 1 - qdone #Part of the quotient is in s
     rpq = ctrand(remainingpos - lam)
     lam = lam + ctcond(casepq, rpq, 0)
@@ -118,21 +133,72 @@ def StC(B, d, n, t):
     
     return lambdaVec
 
+#Converts a list of binary strings (bitstrings or auxiliary.BitVectors) of the same length to vectors of weight t, as StC does for each of them
+#The scan over the bits runs on all strings together: the state of StC is a NumPy array with one entry per string, and every
+#step is the same branch-free update as in StC (with arithmetic selects in place of ctcond); StC_finish then runs on each string in order,
+#so with the same random state the output is exactly that of calling StC on each string in turn
+@instrument.timed
+def StC_batch(Bs, d, n, t):
+    Bs = [auxiliary.to_bitvector(B) for B in Bs]
+    b = len(Bs)
+    if b == 0:
+        return []
+    l = Bs[0].length
+    assert all(B.length == l for B in Bs)
+    packed = np.frombuffer(b''.join(B.to_bytes() for B in Bs), dtype=np.uint8).reshape(b, (l + 7) // 8)
+    bits = np.unpackbits(packed, axis=1)[:, :l].astype(np.int64)
+    rows = np.arange(b)
+    lambdaVec = np.zeros((b, t), dtype=np.int64)
+    
+    qdone = np.zeros(b, dtype=np.int64)
+    rdone = np.zeros(b, dtype=np.int64)
+    lambdadone = np.zeros(b, dtype=np.int64)
+    
+    q = np.zeros(b, dtype=np.int64)
+    r = np.zeros(b, dtype=np.int64)
+    lam = np.zeros(b, dtype=np.int64)
+    
+    idx = np.zeros(b, dtype=np.int64)
+    rbitctr = np.zeros(b, dtype=np.int64)
+    remainingpos = np.full(b, n - t, dtype=np.int64)
+    rlimit = int(log2(d)) + 1
+    
+    for ind in range(l):
+        bit = bits[:, ind]
+        qdone = qdone | (1 - bit)
+        q = q + (bit & (1 - qdone))
+        rbitctr = rbitctr + qdone 
+        rdone = (rbitctr == rlimit).astype(np.int64)
+        r = 2 * r + (bit & qdone)
+        lam = q * d + r 
+        lambdaVec[rows, idx] = lam
+        lambdadone = qdone & rdone 
+        keep = 1 - lambdadone
+        idx = idx + lambdadone
+        remainingpos = remainingpos - lambdadone * lam
+        q = keep * q
+        qdone = keep * qdone
+        r = keep * r
+        rbitctr = keep * rbitctr
+    
+    return [StC_finish(lambdaVec[i].tolist(), d, t, int(qdone[i]), int(rdone[i]), int(lambdadone[i]), int(q[i]), int(r[i]),
+                       int(lam[i]), int(idx[i]), int(rbitctr[i]), int(remainingpos[i])) for i in range(b)]
+
 #Converts a vector of weight t (represented as run-length encodings) to a binary string of fixed length   
+#Each lambda is written as q ones, a zero and the log2(d) bits of r (where lambda = q * d + r) to an auxiliary.BitWriter,
+#stopping as soon as l bits have been written
+@instrument.timed
 def CtS(lambdaVec, d, n, t, l):
-    B = ''
+    B = auxiliary.BitWriter()
+    rbits = max(int(log2(d)), 1) #the remainder field is never empty, since bin(0) is '0'
     for lam in lambdaVec:
-        sub = ''
+        if len(B) >= l:
+            break
         q = int(lam / d)
-        r = bin(lam % d)[2:]
-        while len(r) < int(log2(d)):
-            r = '0' + r
-        unary_q = ''
-        for j in range(q):
-            unary_q = unary_q + '1'
-        sub = sub + unary_q + '0' + r 
-        B = B + sub 
-    relevant_B = B[:l]
+        B.write_ones(q)
+        B.write(0, 1)
+        B.write(lam % d, rbits)
+    relevant_B = B.to_bitvector()[:l].to_bitstring()
     return relevant_B
 
 #Test of the correctness and invertibility of the conversion function    
@@ -151,10 +217,24 @@ def test(n, t):
         assert vector(z).hamming_weight() == t
         b = CtS(lv, d, t, n, l)
         assert b == B
+
+
+#Test that StC_batch agrees with StC on each string
+def test_batch(n, t):
+    import random
+    l, d = fix_l_d(n, t)
+    for i in range(10):
+        Bs = [''.join(str(randrange(2)) for j in range(l)) for k in range(100)]
+        state = random.getstate()
+        lvs = [StC(B, d, n, t) for B in Bs]
+        random.setstate(state)
+        assert StC_batch(Bs, d, n, t) == lvs
+        assert [CtS(lv, d, n, t, l) for lv in lvs] == Bs
                     
 #test(1024, 38)
 #test(2048, 69)
 #test(4096, 128)
 #lv = StC('100110111000011111001110111110', 32, 4096, 128)        #
 #print(lv)
-#print(CtS(lv, 32, 128, 4096, 30))
\ No newline at end of file
+#print(CtS(lv, 32, 128, 4096, 30))
+#test_batch(1024, 38)
\ No newline at end of file
@@ -0,0 +1,168 @@
+'''
+Author: Nishka Dasgupta
+
+This file implements per-stage timing instrumentation for the encryption and decryption pipelines. The stages of classic.py, bernstein.py,
+syndrome.py, auxiliary.py, sendrier.py, ideal_stc.py and cca_conversions.py run inside named spans. While instrumentation is disabled (the default)
+a span is one shared do-nothing context manager, so a stage costs only a function call and a flag test. While it is enabled every span adds its
+wall-clock time and one call to the totals of its name. Spans nest, and the time of a span includes the time of the spans inside it.
+Totals are kept per process, so stages run in the workers of cca_conversions.decrypt_batch are not collected.
+
+Usage:
+    with instrument.profiling() as stats:
+        classic.decrypt(c, sk, pk, ctx)
+    instrument.report(stats)
+
+Functions:
+ - enable: Turn instrumentation on
+ - disable: Turn instrumentation off (the totals are kept)
+ - is_enabled: Whether instrumentation is on
+ - span: A context manager that times one stage under a name
+ - timed: A decorator that runs every call of a function in a span named after the function
+ - timings: The aggregated call counts and total times of every span name
+ - reset: Clear the aggregated totals
+ - profiling: A context manager that turns instrumentation on for a block and collects the totals of that block (blocks can nest)
+ - report: Print aggregated totals as a table
+ - test_instrument: Test that spans are counted and timed only while enabled
+'''
+
+import functools
+import threading
+import timeit
+from contextlib import contextmanager
+
+enabled = False
+
+#Span name -> [calls, total seconds]
+totals = {}
+totals_lock = threading.Lock()
+
+#The span handed out while instrumentation is disabled
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = NullSpan()
+
+#A running span; its time is added to the totals of its name on exit, also when the stage raises
+class Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = timeit.default_timer() - self.start
+        with totals_lock:
+            entry = totals.get(self.name)
+            if entry is None:
+                totals[self.name] = [1, elapsed]
+            else:
+                entry[0] = entry[0] + 1
+                entry[1] = entry[1] + elapsed
+        return False
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def is_enabled():
+    return enabled
+
+#Takes as input the name of a stage, conventionally 'module.function.stage'
+#Returns a context manager timing the stage (NULL_SPAN if instrumentation is disabled)
+def span(name):
+    if not enabled:
+        return NULL_SPAN
+    return Span(name)
+
+#Decorator: every call of the function runs in a span named 'module.function' (or 'module.Class.method')
+def timed(fn):
+    name = fn.__module__ + '.' + fn.__qualname__
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not enabled:
+            return fn(*args, **kwargs)
+        with Span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+#Returns a dict mapping every span name to a dict with its number of calls, total time and mean time (in seconds)
+def timings():
+    with totals_lock:
+        return {name: {'calls': calls, 'total': total, 'mean': total / calls} for name, (calls, total) in totals.items()}
+
+def reset():
+    with totals_lock:
+        totals.clear()
+
+#Context manager: turns instrumentation on for the block, then restores the previous state
+#Yields a dict that holds, once the block is left, the timings() of the spans run in the block: the totals are snapshot on entry and the
+#difference is taken on exit, so the shared totals (and any enclosing profiling block) are left as they are
+@contextmanager
+def profiling():
+    was_enabled = enabled
+    with totals_lock:
+        before = {name: (calls, total) for name, (calls, total) in totals.items()}
+    enable()
+    stats = {}
+    try:
+        yield stats
+    finally:
+        if not was_enabled:
+            disable()
+        with totals_lock:
+            for name, (calls, total) in totals.items():
+                calls0, total0 = before.get(name, (0, 0.0))
+                if calls > calls0:
+                    stats[name] = {'calls': calls - calls0, 'total': total - total0, 'mean': (total - total0) / (calls - calls0)}
+
+#Takes as input the output of timings() (by default the current totals)
+#Prints one line per span name, sorted by name so that nested stages follow the stage they belong to
+def report(stats=None):
+    if stats is None:
+        stats = timings()
+    print("%-55s %8s %12s %12s" % ('span', 'calls', 'total (s)', 'mean (s)'))
+    for name in sorted(stats):
+        s = stats[name]
+        print("%-55s %8d %12.6f %12.6f" % (name, s['calls'], s['total'], s['mean']))
+
+def test_instrument():
+    def stage(x):
+        with span('test.stage.inner'):
+            return x + 1
+    stage = timed(stage)
+    key = __name__ + '.' + stage.__qualname__
+    assert not is_enabled()
+    assert span('test.off') is NULL_SPAN
+    reset()
+    assert stage(1) == 2
+    assert timings() == {}
+    with profiling() as stats:
+        for i in range(3):
+            stage(i)
+        try:
+            with span('test.raises'):
+                raise ValueError
+        except ValueError:
+            pass
+        with profiling() as inner:
+            stage(0)
+    assert not is_enabled()
+    assert inner[key]['calls'] == 1 and 'test.raises' not in inner
+    assert stats[key]['calls'] == 4
+    assert stats['test.stage.inner']['calls'] == 4
+    assert stats[key]['total'] >= stats['test.stage.inner']['total']
+    assert stats['test.raises']['calls'] == 1
+    stage(0)
+    assert timings()[key]['calls'] == 4
+
+#test_instrument()
@@ -0,0 +1,194 @@
+'''
+Author: Nishka Dasgupta
+
+This file implements a compact, versioned binary format for Classic McEliece keys (as produced by classic.keygen), so keys can be stored and shipped
+without pickling sagemath objects. The public matrix is bit-packed with 8-byte aligned rows, so a public key file can be memory-mapped and used for
+encryption without copying; worker processes that map the same file share it through the page cache.
+
+File layout (little-endian):
+ - header (HEADER_SIZE bytes): magic (4 bytes), version (uint16), form (uint16, FORM_DENSE or FORM_SYSTEMATIC), n, t, m, k (uint32 each),
+   and in secret key files the field modulus as an integer (uint32); zero padded
+ - public key file: the k rows of SGP (dense) or T (systematic), each packed big-endian into row_bytes(ncols) bytes
+ - secret key file: the permutation (n * uint32), the Goppa polynomial g (t + 1 * uint16), the support (n * uint16), then S and S^{-1} (k rows each, packed)
+Field elements are stored as integers in the polynomial basis (see gf2m.py).
+
+Functions:
+ - row_bytes: Bytes per packed row of a matrix with a given number of columns
+ - pack_matrix: Pack a binary sagemath matrix into a NumPy byte array
+ - unpack_matrix: Unpack a NumPy byte array into a binary sagemath matrix
+ - save_public_key: Write a public key file
+ - save_secret_key: Write a secret key file
+ - read_header: Read and check the header of a key file
+ - map_public_key: Memory-map the public matrix of a key file without copying
+ - load_public_key: Load a public key file as a public key tuple
+ - load_secret_key: Load a secret key file as a secret key tuple
+ - encrypt_mapped: Classic McEliece encryption straight from a memory-mapped public key
+ - test_keyfile: Test that saved keys load back identically
+'''
+
+from sage.all_cmdline import *   # import sage library
+import os
+import struct
+import tempfile
+import numpy as np
+import classic
+import gf2m
+
+VERSION = 1
+PUBLIC_MAGIC = b'MCPK'
+SECRET_MAGIC = b'MCSK'
+FORM_DENSE = 0
+FORM_SYSTEMATIC = 1
+HEADER_FORMAT = '<4sHHIIIII'
+HEADER_SIZE = 64
+
+#Returns the number of bytes in a packed row of ncols bits (a multiple of 8, so rows can be viewed as uint64 words)
+def row_bytes(ncols):
+    return ((ncols + 63) // 64) * 8
+
+#Takes as input a binary sagemath matrix
+#Returns a NumPy uint8 array of shape (nrows, row_bytes(ncols)) with the bits of each row packed most significant first
+def pack_matrix(M):
+    bits = np.zeros((M.nrows(), row_bytes(M.ncols()) * 8), dtype=np.uint8)
+    bits[:, :M.ncols()] = M.numpy(dtype=np.uint8)
+    return np.packbits(bits, axis=1)
+
+#Takes as input a packed array as returned by pack_matrix and the number of columns
+#Returns the binary sagemath matrix
+def unpack_matrix(packed, ncols):
+    bits = np.unpackbits(np.asarray(packed), axis=1)[:, :ncols]
+    return matrix(GF(2), bits.shape[0], ncols, bits.tolist())
+
+#Returns the packed header of a key file
+def pack_header(magic, form, n, t, m, k, modulus=0):
+    header = struct.pack(HEADER_FORMAT, magic, VERSION, form, n, t, m, k, modulus)
+    return header + b'\x00' * (HEADER_SIZE - len(header))
+
+#Takes as input a file path, a public key from classic.keygen and the field degree m
+#Writes the public key file
+def save_public_key(path, pk, m):
+    n, k = classic.public_key_dimensions(pk)
+    t = pk[1]
+    form = FORM_SYSTEMATIC if classic.is_systematic(pk) else FORM_DENSE
+    with open(path, 'wb') as f:
+        f.write(pack_header(PUBLIC_MAGIC, form, n, t, m, k))
+        f.write(pack_matrix(pk[0]).tobytes())
+
+#Takes as input a file path, a secret key from classic.keygen and the matching public key
+#Writes the secret key file (S^{-1} is computed if the secret key does not hold it)
+def save_secret_key(path, sk, pk):
+    n, k = classic.public_key_dimensions(pk)
+    t = pk[1]
+    form = FORM_SYSTEMATIC if classic.is_systematic(pk) else FORM_DENSE
+    S = sk[0]
+    P = sk[1]
+    if not isinstance(P, list):
+        P = classic.permutation_from_matrix(P)
+    g, L, F = sk[2]
+    S_inv = sk[3] if len(sk) > 3 else S.inverse()
+    tables = gf2m.field_tables(F)
+    modulus = sum(int(c) << i for i, c in enumerate(F.modulus().list()))
+    with open(path, 'wb') as f:
+        f.write(pack_header(SECRET_MAGIC, form, n, t, F.degree(), k, modulus))
+        f.write(np.array(P, dtype='<u4').tobytes())
+        f.write(gf2m.to_ints(tables, g.list()).astype('<u2').tobytes())
+        f.write(gf2m.to_ints(tables, L).astype('<u2').tobytes())
+        f.write(pack_matrix(S).tobytes())
+        f.write(pack_matrix(S_inv).tobytes())
+
+#Takes as input a file path and the expected magic
+#Returns the header as a dict (form, n, t, m, k, modulus)
+def read_header(path, magic):
+    with open(path, 'rb') as f:
+        data = f.read(HEADER_SIZE)
+    fields = struct.unpack(HEADER_FORMAT, data[:struct.calcsize(HEADER_FORMAT)])
+    if fields[0] != magic:
+        raise ValueError('%s is not a key file of the expected kind' % path)
+    if fields[1] != VERSION:
+        raise ValueError('%s has unsupported key file version %d' % (path, fields[1]))
+    return {'form': fields[2], 'n': fields[3], 't': fields[4], 'm': fields[5], 'k': fields[6], 'modulus': fields[7]}
+
+#Takes as input the path of a public key file
+#Returns (header, rows): rows is a read-only NumPy memmap of the packed public matrix, which is not copied into memory
+def map_public_key(path):
+    header = read_header(path, PUBLIC_MAGIC)
+    ncols = header['n'] if header['form'] == FORM_DENSE else header['n'] - header['k']
+    rows = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE, shape=(header['k'], row_bytes(ncols)))
+    return header, rows
+
+#Takes as input the path of a public key file
+#Returns the public key tuple in the form used by classic.py
+def load_public_key(path):
+    header, rows = map_public_key(path)
+    if header['form'] == FORM_SYSTEMATIC:
+        T = unpack_matrix(rows, header['n'] - header['k'])
+        return (T, header['t'], classic.SYSTEMATIC)
+    G = unpack_matrix(rows, header['n'])
+    return (G, header['t'])
+
+#Takes as input the path of a secret key file
+#Returns the secret key tuple (S, P, (g, L, F), S^{-1}) in the form used by classic.py
+def load_secret_key(path):
+    header = read_header(path, SECRET_MAGIC)
+    n, t, m, k = header['n'], header['t'], header['m'], header['k']
+    F = GF(2**m)
+    modulus = sum(int(c) << i for i, c in enumerate(F.modulus().list()))
+    if modulus != header['modulus']:
+        bits = header['modulus']
+        F = GF(2**m, 'z', modulus=GF(2)['z']([(bits >> i) & 1 for i in range(m + 1)]))
+    tables = gf2m.field_tables(F)
+    data = np.fromfile(path, dtype=np.uint8, offset=HEADER_SIZE)
+    pos = 0
+    P = np.frombuffer(data, dtype='<u4', count=n, offset=pos).tolist()
+    pos = pos + 4 * n
+    g = F['x'](gf2m.to_field(tables, np.frombuffer(data, dtype='<u2', count=t + 1, offset=pos)))
+    pos = pos + 2 * (t + 1)
+    L = gf2m.to_field(tables, np.frombuffer(data, dtype='<u2', count=n, offset=pos))
+    pos = pos + 2 * n
+    size = k * row_bytes(k)
+    S = unpack_matrix(data[pos:pos + size].reshape(k, row_bytes(k)), k)
+    pos = pos + size
+    S_inv = unpack_matrix(data[pos:pos + size].reshape(k, row_bytes(k)), k)
+    return (S, P, (g, L, F), S_inv)
+
+#Takes as input a message m (sagemath 1 * k matrix), an error vector z (sagemath 1 * n matrix) and the output of map_public_key
+#Returns the ciphertext mG + z (or (m | mT) + z for a systematic key) as a sagemath matrix, reading only the mapped rows selected by m
+def encrypt_mapped(m, z, mapped):
+    header, rows = mapped
+    n, k = header['n'], header['k']
+    ones = [j for j in m.nonzero_positions_in_row(0)]
+    words = rows.view(np.uint64)
+    if len(ones) > 0:
+        mG = np.unpackbits(np.bitwise_xor.reduce(words[ones], axis=0).view(np.uint8))
+    else:
+        mG = np.zeros(words.shape[1] * 64, dtype=np.uint8)
+    if header['form'] == FORM_SYSTEMATIC:
+        c = m.augment(matrix(GF(2), 1, n - k, mG[:n - k].tolist()))
+    else:
+        c = matrix(GF(2), 1, n, mG[:n].tolist())
+    return c + z
+
+def test_keyfile():
+    with tempfile.TemporaryDirectory() as tmp:
+        path_pk = os.path.join(tmp, 'test_key.pk')
+        path_sk = os.path.join(tmp, 'test_key.sk')
+        for systematic in False, True:
+            n, t, m = 64, 4, 6
+            pk, sk = classic.keygen(n, t, m, systematic)
+            save_public_key(path_pk, pk, m)
+            save_secret_key(path_sk, sk, pk)
+            pk2 = load_public_key(path_pk)
+            sk2 = load_secret_key(path_sk)
+            assert pk2 == pk
+            assert sk2[0] == sk[0] and sk2[1] == sk[1] and sk2[3] == sk[3]
+            assert sk2[2][0] == sk[2][0] and sk2[2][1] == sk[2][1]
+            n, k = classic.public_key_dimensions(pk)
+            msg = random_matrix(GF(2), 1, k)
+            z = matrix(GF(2), 1, n)
+            classic.select_error(z, t, n)
+            c = encrypt_mapped(msg, z, map_public_key(path_pk))
+            assert c == classic.encrypt(msg, z, pk)
+            d, e = classic.decrypt(c, sk2, pk2)
+            assert d == msg and e == z
+
+#test_keyfile()
@@ -0,0 +1,127 @@
+'''
+Author: Nishka Dasgupta
+
+This file implements a pool of pre-generated Classic McEliece keypairs, so that key rotation does not pay for classic.keygen on the request path.
+Keypairs for one parameter set (n, t, m) are generated in background worker processes until the pool holds depth of them; checkout hands one out
+in O(1) and immediately schedules a replacement.
+
+Classes:
+ - KeyPool: A pool of keypairs for one parameter set, refilled by background worker processes
+
+Functions:
+ - test_keypool: Test that pooled keys work and that the pool refills and closes
+'''
+
+from sage.all_cmdline import *   # import sage library
+import multiprocessing
+import threading
+import time
+from collections import deque
+import classic
+
+#Takes as input the keygen parameters (n, t, m), the number of keypairs to keep ready (depth), the number of worker processes
+#(None for one per CPU), and the systematic and method arguments of classic.keygen
+#Can be used as a context manager, which closes the pool on exit
+class KeyPool:
+    def __init__(self, n, t, m, depth=4, processes=None, systematic=False, method='parity_check'):
+        assert depth > 0
+        self.args = (n, t, m, systematic, method)
+        self.depth = depth
+        self.keys = deque()
+        self.pending = 0 #keypairs being generated
+        self.error = None
+        self.closed = False
+        self.cond = threading.Condition()
+        self.pool = multiprocessing.Pool(processes)
+        self.refill()
+
+    #Schedules enough keygen jobs to bring the ready and pending keypairs up to depth
+    def refill(self):
+        with self.cond:
+            while not self.closed and len(self.keys) + self.pending < self.depth:
+                self.pending = self.pending + 1
+                self.pool.apply_async(classic.keygen, self.args, callback=self.add, error_callback=self.failed)
+
+    #Callback (run in the result thread of the worker pool) for a finished keygen job
+    def add(self, keypair):
+        with self.cond:
+            self.pending = self.pending - 1
+            if not self.closed:
+                self.keys.append(keypair)
+            self.cond.notify_all()
+
+    #Callback for a keygen job that raised; the exception is passed on to the next checkout
+    def failed(self, exc):
+        with self.cond:
+            self.pending = self.pending - 1
+            self.error = exc
+            self.cond.notify_all()
+
+    #Returns the number of keypairs ready for checkout
+    def __len__(self):
+        with self.cond:
+            return len(self.keys)
+
+    #Returns a keypair (pk, sk) as from classic.keygen, waiting for one if the pool is empty
+    #Raises TimeoutError if none is ready within timeout seconds (None waits forever)
+    def checkout(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while len(self.keys) == 0:
+                if self.closed:
+                    raise ValueError('checkout from a closed KeyPool')
+                if self.error is not None:
+                    exc = self.error
+                    self.error = None
+                    self.refill()
+                    raise exc
+                #wait only for the time left, so wakeups that find no keypair do not extend the timeout
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError('no keypair ready after %s seconds' % timeout)
+                self.cond.wait(remaining)
+            keypair = self.keys.popleft()
+            self.refill()
+        return keypair
+
+    #Waits until depth keypairs are ready (or until timeout seconds have passed); returns True if the pool is full
+    def wait_full(self, timeout=None):
+        with self.cond:
+            return self.cond.wait_for(lambda: len(self.keys) >= self.depth or self.closed, timeout) and not self.closed
+
+    #Stops the worker processes and drops the keypairs that were not checked out
+    def close(self):
+        with self.cond:
+            if self.closed:
+                return
+            self.closed = True
+            self.keys.clear()
+            self.cond.notify_all()
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def test_keypool():
+    n, t, m = 64, 4, 6
+    with KeyPool(n, t, m, depth=3, processes=2) as pool:
+        assert pool.wait_full()
+        for i in range(5):
+            pk, sk = pool.checkout()
+            msg = random_matrix(GF(2), 1, pk[0].nrows())
+            z = matrix(GF(2), 1, n)
+            classic.select_error(z, t, n)
+            d, e = classic.decrypt(classic.encrypt(msg, z, pk), sk, pk)
+            assert d == msg and e == z
+        assert pool.wait_full()
+    try:
+        pool.checkout()
+        assert False
+    except ValueError:
+        pass
+
+#test_keypool()
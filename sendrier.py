@@ -12,33 +12,37 @@ Functions:
  - best_d: The optimal value of d 
  - encode_fd: An implementation of f_d() in the paper 
  - decode_fd: An implementation of f_d()^{-1} in the paper 
+ - fd_params: The value of d and the f_d parameters u and 2^u - d for (n, t), computed once per pair
  - CWtoB: Conversion of constant-weight-vector to binary string 
  - BtoCW: Conversion of binary string to constant-weight-vector
+ - CWtoB_recursive: The original recursive CWtoB (reference for tests)
+ - BtoCW_recursive: The original recursive BtoCW (reference for tests)
  - Various tests
+
+CWtoB and BtoCW are timed in instrument.py spans.
 '''
 
 from sage.all_cmdline import *   # import sage library
 from math import ceil, log2
 from random import randrange
+from functools import lru_cache
 import classic
+import auxiliary
+import instrument
 
 #Takes as input an integer x and a bitlength u 
 #Returns the u least significant bits of the binary conversion of the integer
 def base2(x, u):
-    binx = bin(x)[2:]
     if u > 0:
-        if len(binx) >= u:
-            return binx[-u:]
-        else:
-            while len(binx) < u:
-                binx = '0' + binx
-            return binx
+        return auxiliary.BitVector(x & ((1 << u) - 1), u).to_bitstring()
     else:
         return None
 
-#Takes as input a bitstring B, a number of bits to read u, and a starting index 
+#Takes as input a bitstring (or auxiliary.BitReader) B, a number of bits to read u, and a starting index 
 #Returns a substring of u bits read from index start, converted to a decimal integer
 def read_bits(B, u, start):
+    if isinstance(B, auxiliary.BitReader):
+        return B.peek(u, start)
     if start < 0:
         return 0
     substr = B[start:start+u]
@@ -80,8 +84,79 @@ def decode_fd(d, B, start):
         start = start + 1
     return delta, start
 
-#A recursive function to convert a constant-weight vector (expressed as run-length encodings) to a binary string    
+#Takes as input n, t
+#Returns (d, u, limit) with d = best_d(n, t), u = ceil(log2(d)) and limit = 2^u - d, as used by encode_fd and decode_fd
+#Cached, so a parameter set computes the floating-point formula of best_d once per (n, t) pair that the conversions reach
+@lru_cache(maxsize=None)
+def fd_params(n, t):
+    d = best_d(n, t)
+    u = ceil(log2(d))
+    return d, u, (2 ** u) - d
+
+#Converts a constant-weight vector (expressed as run-length encodings) to a binary string
+#Iterative version of CWtoB_recursive with the same output: each step appends its bits to one auxiliary.BitWriter
+@instrument.timed
 def CWtoB(n, t, delta_tuple):
+    out = auxiliary.BitWriter()
+    i = 0
+    used = 0 #how much of delta_tuple[i] the '1' steps have consumed
+    while (t > 0) and (n > t):
+        d, u, limit = fd_params(n, t)
+        delta_1 = delta_tuple[i] - used
+        if delta_1 >= d:
+            out.write(1, 1)
+            used = used + d
+            n = n - d
+        else:
+            out.write(0, 1)
+            #encode_fd(delta_1, d)
+            if delta_1 < limit:
+                bits = u - 1
+            else:
+                delta_1 = delta_1 + limit
+                bits = u
+            out.write(delta_1, bits)
+            n = n - (delta_tuple[i] - used) - 1
+            t = t - 1
+            i = i + 1
+            used = 0
+    return out.to_bitstring()
+
+#Converts an arbitrary binary string to a list of run-length encodings representing a vector of weight t
+#Iterative version of BtoCW_recursive with the same output and the same reads of B; a bitstring B is read through an auxiliary.BitReader
+@instrument.timed
+def BtoCW(n, t, delta, B, start):
+    if isinstance(B, str):
+        B = auxiliary.BitReader.from_bitstring(B)
+    res = []
+    while t > 0:
+        if n <= t:
+            res.append(delta)
+            delta = 0
+            n = n - 1
+            t = t - 1
+            continue
+        d, u, limit = fd_params(n, t)
+        next_bit = read_bits(B, 1, start)
+        start = start + 1
+        if next_bit == 1:
+            n = n - d
+            delta = delta + d
+        else:
+            #decode_fd(d, B, start)
+            i = read_bits(B, u - 1, start)
+            start = start + u - 1
+            if i >= limit:
+                i = (2 * i) + read_bits(B, 1, start) - (2 ** u) + d
+                start = start + 1
+            res.append(delta + i)
+            n = n - i - 1
+            t = t - 1
+            delta = 0
+    return res
+
+#A recursive function to convert a constant-weight vector (expressed as run-length encodings) to a binary string    
+def CWtoB_recursive(n, t, delta_tuple):
     if (t == 0) or (n <= t):
         return ''
     d = best_d(n, t)
@@ -90,7 +165,7 @@ def CWtoB(n, t, delta_tuple):
         new_delta_lst = list(delta_tuple)
         new_delta_lst[0] = delta_1 - d
         new_delta_tuple = tuple(new_delta_lst)
-        res = '1' + CWtoB(n - d, t, new_delta_tuple)
+        res = '1' + CWtoB_recursive(n - d, t, new_delta_tuple)
         return res
     else:
         enc = encode_fd(delta_1, d)
@@ -100,26 +175,26 @@ def CWtoB(n, t, delta_tuple):
         new_delta_lst = list(delta_tuple)
         new_delta_lst = new_delta_lst[1:]
         new_delta_tuple = tuple(new_delta_lst)
-        res = s + CWtoB(n - delta_1 - 1, t - 1, new_delta_tuple)
+        res = s + CWtoB_recursive(n - delta_1 - 1, t - 1, new_delta_tuple)
         return res
 
 #A recursive function to convert an arbitrary binary string to a list of run-length encodings representing a vector of weight t        
-def BtoCW(n, t, delta, B, start):
+def BtoCW_recursive(n, t, delta, B, start):
     if t == 0:
         return []
     elif n <= t:
-        res = [delta] + BtoCW(n - 1, t - 1, 0, B, start)
+        res = [delta] + BtoCW_recursive(n - 1, t - 1, 0, B, start)
         return res
     else:
         d = best_d(n, t)
         next_bit = read_bits(B, 1, start)
         start = start + 1
         if next_bit == 1:
-            res = BtoCW(n - d, t, delta + d, B, start)
+            res = BtoCW_recursive(n - d, t, delta + d, B, start)
             return res
         else:
             i, start = decode_fd(d, B, start)
-            res = [delta + i] + BtoCW(n - i - 1, t - 1, 0, B, start)
+            res = [delta + i] + BtoCW_recursive(n - i - 1, t - 1, 0, B, start)
             return res
 
 #Test that the functions for f_d and its inverse work correctly for random inputs
@@ -150,8 +225,7 @@ def test_encode_decode_fd():
 def test_BtoCW_weight():
     n = 2048
     t = 29
-    nct = int(ceil(factorial(n)/(factorial(t) * factorial(n-t))))
-    bitlength = int(ceil(log2(nct)))
+    nct, bitlength, bytelength = auxiliary.binomial_params(n, t)
     #print(bitlength)
     for i in range(100):
         r = random_matrix(GF(2), 1, bitlength)
@@ -181,8 +255,7 @@ def test_BtoCW_weight():
 def test_BtoCW_unique():
     n = 2048
     t = 29
-    nct = int(ceil(factorial(n)/(factorial(t) * factorial(n-t))))
-    bitlength = int(ceil(log2(nct)))
+    nct, bitlength, bytelength = auxiliary.binomial_params(n, t)
     r = random_matrix(GF(2), 1, bitlength)
     B = ''
     for ele in r[0]:
@@ -225,8 +298,7 @@ def test_conversion_bijective():
     t = 29
     #n = 30
     #t = 5
-    nct = int(ceil(factorial(n)/(factorial(t) * factorial(n-t))))
-    bitlength = int(ceil(log2(nct)))
+    nct, bitlength, bytelength = auxiliary.binomial_params(n, t)
     print(bitlength)
     for i in range(10):
         print("Test", i)
@@ -250,8 +322,8 @@ def test_conversion_bijective():
 def test_reverse_bijection():
     n = 30
     t = 5
-    nct = int(ceil(factorial(n)/(factorial(t) * factorial(n-t))))
-    bitlength = int(ceil(log2(nct))) - 1
+    nct, bitlength, bytelength = auxiliary.binomial_params(n, t)
+    bitlength = bitlength - 1
     for i in range(1):
         r = random_matrix(GF(2), 1, bitlength)
         B = ''
@@ -261,7 +333,17 @@ def test_reverse_bijection():
         if not (res == B):
             print(delta_lst)
             print(res, B)
-        
+
+#Test that the iterative conversions give exactly the output of the recursive ones
+def test_iterative_conversions():
+    for (n, t) in [(30, 5), (1024, 38), (2048, 29)]:
+        bitlength = auxiliary.binomial_params(n, t)[1]
+        for i in range(100):
+            B = ''.join(str(randrange(2)) for j in range(bitlength))
+            delta_lst = BtoCW(n, t, 0, B, 0)
+            assert delta_lst == BtoCW_recursive(n, t, 0, B, 0)
+            assert CWtoB(n, t, tuple(delta_lst)) == CWtoB_recursive(n, t, tuple(delta_lst))
+
 '''
 test_decode_encode_fd()
 print("decode_fd(encode_fd()) works")
@@ -280,4 +362,7 @@ test_conversion_bijective()
 print("BtoCW(CWtoB()) works")
 
 test_reverse_bijection()
+
+test_iterative_conversions()
+print("Iterative BtoCW and CWtoB match the recursive versions")
 '''
\ No newline at end of file
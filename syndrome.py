@@ -0,0 +1,167 @@
+'''
+Author: Nishka Dasgupta
+
+This file contains a syndrome-based decoder for binary Goppa codes, as an alternative to the interpolation-based decoder in bernstein.py.
+Since g is square-free, the binary Goppa code of g is the same as the binary Goppa code of g^2, so the syndrome with respect to g^2 has 2t values
+and the Berlekamp-Massey algorithm finds the locator of up to t errors in O(t^2) field operations.
+The decoder runs on the table-driven engine in gf2m.py; sagemath elements are converted only on the way in and out.
+The syndrome, Berlekamp-Massey and root-finding stages of syndrome_errors are timed in instrument.py spans.
+References:
+ - Daniel J. Bernstein. Understanding binary-Goppa decoding. Cryptology ePrint Archive, Paper 2022/473. https://eprint.iacr.org/2022/473. 2022.
+ - James L. Massey. "Shift-register synthesis and BCH decoding". In: IEEE Transactions on Information Theory 15.1 (1969), pp. 122–127.
+
+Functions:
+ - parity_check: The parity-check table over GF(2^m) with entries alpha_i^j / g(alpha_i)^2 (computed once per key)
+ - syndrome: The 2t syndrome values of a received word
+ - berlekamp_massey: The shortest linear recurrence generating a sequence (over the gf2m engine)
+ - syndrome_errors: Decode with the syndrome; same inputs and output as bernstein.goppa_errors, plus an optional precomputed parity-check table
+ - test_syndrome_errors: Test that syndrome_errors agrees with bernstein.goppa_errors and bernstein.goppa_decode
+'''
+
+from sage.all_cmdline import *   # import sage library
+import sys
+import numpy as np
+import bernstein
+import gf2m
+import instrument
+
+#Takes as input the code parameters n, t, the field k, the support alpha and the square-free Goppa polynomial g
+#Returns the parity-check table (tables, alpha, H): the gf2m tables of k, the support as integers, and the n*2t integer array
+#H with H[i, j] = alpha_i^j / g(alpha_i)^2 (one row per support point, so a syndrome is an XOR of rows)
+def parity_check(n, t, k, alpha, g):
+    alpha = list(alpha)
+    assert k.is_field() and k.characteristic() == 2
+    assert g.base_ring() == k and g.degree() == t and g.is_squarefree()
+    assert len(alpha) == n and len(set(alpha)) == n
+    tables = gf2m.field_tables(k)
+    alpha_ints = gf2m.to_ints(tables, alpha)
+    g_ints = gf2m.to_ints(tables, g.list())
+    w = gf2m.inv(tables, gf2m.square(tables, gf2m.poly_eval(tables, g_ints, alpha_ints)))
+    H = np.zeros((n, 2 * t), dtype=np.int64)
+    for j in range(2 * t):
+        H[:, j] = w
+        w = gf2m.mul(tables, w, alpha_ints)
+    return tables, alpha_ints, H
+
+#Takes as input a parity-check table and a received word r (an array of field integers)
+#Returns the syndrome as an array of 2t field integers
+def syndrome(parity, r):
+    tables, alpha_ints, H = parity
+    if H.shape[1] == 0:
+        return np.zeros(0, dtype=np.int64)
+    nonzero = np.nonzero(r)[0]
+    if np.all(r[nonzero] == 1):
+        #binary word: the syndrome is the XOR of the rows at its ones
+        rows = H[nonzero]
+    else:
+        rows = gf2m.mul(tables, H[nonzero], r[nonzero][:, None])
+    return np.bitwise_xor.reduce(rows, axis=0)
+
+#Takes as input the gf2m tables of a field and a sequence s of field integers
+#Returns (C, L): the connection polynomial C (as a list of L + 1 integer coefficients, C[0] = 1) of the shortest linear recurrence of length L generating s
+def berlekamp_massey(tables, s):
+    exp = tables['exp_list']
+    log = tables['log_list']
+    q1 = tables['q'] - 1
+    C = [1]
+    B = [1]
+    L = 0
+    shift = 1
+    b = 1
+    for j in range(len(s)):
+        d = int(s[j])
+        for i in range(1, min(L, len(C) - 1) + 1):
+            d = d ^ exp[log[C[i]] + log[int(s[j - i])]]
+        if d == 0:
+            shift = shift + 1
+            continue
+        coef = exp[log[d] + q1 - log[b]] #d / b
+        T = list(C)
+        if len(C) < len(B) + shift:
+            C = C + [0] * (len(B) + shift - len(C))
+        for i in range(len(B)):
+            C[i + shift] = C[i + shift] ^ exp[log[coef] + log[B[i]]]
+        if 2 * L <= j:
+            L = j + 1 - L
+            B = T
+            b = d
+            shift = 1
+        else:
+            shift = shift + 1
+    C = C[:L + 1] + [0] * (L + 1 - len(C))
+    return C, L
+
+#Takes as input the same arguments as bernstein.goppa_errors, and optionally the table H = parity_check(n, t, k, alpha, g)
+#Returns the list of n error bits (as elements of k) or None if r is not within distance t of the code
+#All the arithmetic runs on the gf2m engine; sagemath elements are only converted at the start and the end
+def syndrome_errors(n, t, k, alpha, g, r, H=None):
+    r = list(r)
+    assert len(r) == n
+    if H is None:
+        H = parity_check(n, t, k, alpha, g)
+    tables, alpha_ints = H[0], H[1]
+    if n > 0 and r[0].parent().order() == 2:
+        r_ints = np.array([int(ri) for ri in r], dtype=np.int64)
+    else:
+        r_ints = gf2m.to_ints(tables, r)
+    with instrument.span('syndrome.syndrome_errors.syndrome'):
+        s = syndrome(H, r_ints)
+    with instrument.span('syndrome.syndrome_errors.berlekamp_massey'):
+        C, L = berlekamp_massey(tables, s)
+    if L > t:
+        return None
+    with instrument.span('syndrome.syndrome_errors.roots'):
+        #The locator x^L C(1/x) vanishes exactly on the error positions; an error at alpha_i = 0 shows up as L > deg C
+        locator = list(reversed(C))
+        e = (gf2m.poly_eval(tables, locator, alpha_ints) == 0).astype(np.int64)
+        if int(e.sum()) != L:
+            return None
+        if not np.array_equal(syndrome(H, e), s):
+            return None
+    return [k(int(ej)) for ej in e]
+
+def test_syndrome_errors():
+    for m in range(1, 10):
+        q = 2**m
+        print('syndrome_errors %d' % q)
+        sys.stdout.flush()
+        k = GF(q)
+        kpoly = k['x']; (x,) = kpoly._first_ngens(1)
+        for loop in range(100):
+            while True:
+                n = randrange(q + 1)
+                t = randrange(3 + n // m)
+                if t >= n:
+                    t = n
+                a = list(k)
+                shuffle(a)
+                a = a[:n]
+                g = kpoly([k.random_element() for j in range(t)] + [1])
+                if g.is_squarefree():
+                    if all(g(aj) != 0 for aj in a):
+                        break
+            A = kpoly(prod(x - aj for aj in a))
+            Aprime = A.derivative()
+            H = parity_check(n, t, k, a, g)
+            for known in True, False:
+                if known:
+                    f = kpoly([k.random_element() for j in range(n - 2 * t)])
+                    r = [(f * g**2)(aj) / Aprime(aj) for aj in a]
+                    actualweight = randrange(t + 1)
+                    e = [1] * actualweight + [0] * (n - actualweight)
+                    shuffle(e)
+                    for j in range(n):
+                        r[j] += e[j]
+                else:
+                    e = 'unknown'
+                    r = [k.random_element() for j in range(n)]
+                e2 = syndrome_errors(n, t, k, a, g, r, H)
+                assert e2 == syndrome_errors(n, t, k, a, g, r)
+                #the gf2m table engine must agree with the sagemath path of the interpolation decoder
+                assert e2 == bernstein.goppa_errors(n, t, k, a, g, r)
+                if n > 0:
+                    assert e2 == bernstein.goppa_decode(bernstein.goppa_decoder(n, t, k, a, g), r)
+                if known:
+                    assert e2 == e
+
+#test_syndrome_errors()